@@ -0,0 +1,338 @@
+# bulk_import.py
+"""Bulk import of users, class rosters and historical attendance from CSV.
+
+    python bulk_import.py users users.csv
+    python bulk_import.py attendance_records history.csv --import-id fall-2024
+
+Rows are streamed, validated and upserted one chunk at a time, with a few
+chunks in flight. Finished chunks are checkpointed under the import id, so
+re-running the same command resumes where it stopped; upserts make
+re-sending a chunk harmless.
+
+Attendance records are insert-only: a record that already exists is kept
+(and reported as skipped), since the attendance aggregates only follow
+inserts. Student streaks are then recomputed in session order.
+"""
+import os
+import re
+import csv
+import json
+import asyncio
+import logging
+import argparse
+from uuid import uuid4
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from repository import AttendanceRepository
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+IMPORT_CONCURRENCY = int(os.getenv("IMPORT_CONCURRENCY", 4))
+IMPORT_STATE_DIR = os.getenv("IMPORT_STATE_DIR", "imports")
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+$")
+ATTENDANCE_STATUSES = {"present", "late", "absent"}
+
+
+def _email(value: str) -> str:
+    value = value.strip().lower()
+    if not EMAIL_PATTERN.match(value):
+        raise ValueError(f"invalid email {value!r}")
+    return value
+
+
+def _text(value: str) -> str:
+    return value.strip()
+
+
+def _timestamp(value: str) -> str:
+    return datetime.fromisoformat(value.strip()).isoformat()
+
+
+def _status(value: str) -> str:
+    value = value.strip().lower()
+    if value not in ATTENDANCE_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(sorted(ATTENDANCE_STATUSES))}")
+    return value
+
+
+def _score(value: str) -> float:
+    score = float(value)
+    if not 0 <= score <= 1:
+        raise ValueError("face_match_score must be between 0 and 1")
+    return score
+
+
+class ImportKind:
+    def __init__(
+        self,
+        table: str,
+        required: Dict[str, Callable[[str], object]],
+        optional: Dict[str, Callable[[str], object]],
+        on_conflict: List[str],
+    ):
+        self.table = table
+        self.required = required
+        self.optional = optional
+        self.on_conflict = on_conflict
+
+    def columns(self, header: List[str]) -> List[str]:
+        missing = [column for column in self.required if column not in header]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        return list(self.required) + [column for column in self.optional if column in header]
+
+    def validate(self, row: Dict[str, str], columns: List[str]) -> Dict:
+        record = {}
+        for column in columns:
+            value = row.get(column) or ""
+            if not value.strip():
+                if column in self.required:
+                    raise ValueError(f"{column} is required")
+                record[column] = None
+                continue
+            parse = self.required.get(column) or self.optional[column]
+            try:
+                record[column] = parse(value)
+            except ValueError as e:
+                raise ValueError(f"{column}: {e}")
+        return record
+
+
+IMPORT_KINDS = {
+    "users": ImportKind(
+        "users",
+        {"email": _email, "school_id": _text},
+        {"full_name": _text, "role": _text},
+        ["email"],
+    ),
+    "class_students": ImportKind(
+        "class_students",
+        {"class_id": _text, "student_email": _email},
+        {},
+        ["class_id", "student_email"],
+    ),
+    "attendance_records": ImportKind(
+        "attendance_records",
+        {"session_id": _text, "student_email": _email, "check_in_time": _timestamp, "status": _status},
+        {"student_id": _text, "face_match_score": _score},
+        ["session_id", "student_email"],
+    ),
+}
+
+
+class ImportState:
+    """Checkpoint of finished chunks and the per-chunk report, kept in a JSON file"""
+
+    def __init__(self, import_id: str, kind: str, chunk_size: int, state_dir: str = IMPORT_STATE_DIR):
+        self.path = os.path.join(state_dir, f"{re.sub(r'[^A-Za-z0-9._-]', '_', import_id)}.json")
+        self.import_id = import_id
+        self.kind = kind
+        self.chunk_size = chunk_size
+        self.completed: set = set()
+        self.chunks: Dict[int, Dict] = {}
+        self._save_lock = asyncio.Lock()
+
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                saved = json.load(f)
+            if saved["kind"] != kind or saved["chunk_size"] != chunk_size:
+                raise ValueError("Import id was used with a different kind or chunk size")
+            self.completed = set(saved["completed"])
+            self.chunks = {int(index): chunk for index, chunk in saved["chunks"].items()}
+
+    def snapshot(self) -> Dict:
+        # Taken on the event loop, so chunks finishing meanwhile cannot change it mid-write
+        return {
+            "import_id": self.import_id,
+            "kind": self.kind,
+            "chunk_size": self.chunk_size,
+            "completed": sorted(self.completed),
+            "chunks": dict(self.chunks),
+        }
+
+    def write(self, snapshot: Dict):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.path)
+
+    async def save(self):
+        """Write the checkpoint in a thread; saves are serialized, so the newest snapshot lands last"""
+        snapshot = self.snapshot()
+        async with self._save_lock:
+            await asyncio.to_thread(self.write, snapshot)
+
+    def summary(self) -> Dict:
+        chunks = [self.chunks[index] for index in sorted(self.chunks)]
+        return {
+            "import_id": self.import_id,
+            "kind": self.kind,
+            "chunks": len(chunks),
+            "completed_chunks": len(self.completed),
+            "imported_rows": sum(chunk["imported"] for chunk in chunks),
+            "skipped_rows": sum(chunk.get("skipped", 0) for chunk in chunks),
+            "rejected_rows": sum(len(chunk["errors"]) for chunk in chunks),
+            "failed_chunks": [chunk for chunk in chunks if chunk.get("failed")],
+            "errors": [
+                {"chunk": chunk["chunk"], **error}
+                for chunk in chunks for error in chunk["errors"]
+            ][:1000],
+        }
+
+
+def read_chunks(stream: TextIO, chunk_size: int) -> Iterator[Tuple[int, List[str], List[Tuple[int, Dict]]]]:
+    """Yield (chunk index, header, [(line number, row)]) without reading the whole file"""
+    reader = csv.DictReader(stream)
+    header = [column.strip() for column in reader.fieldnames or []]
+    reader.fieldnames = header
+    chunk = []
+    index = 0
+    for row in reader:
+        chunk.append((reader.line_num, row))
+        if len(chunk) == chunk_size:
+            yield index, header, chunk
+            chunk = []
+            index += 1
+    if chunk:
+        yield index, header, chunk
+
+
+async def import_chunk(
+    db: AttendanceRepository,
+    kind: ImportKind,
+    index: int,
+    columns: List[str],
+    rows: List[Tuple[int, Dict]],
+    on_imported: Optional[Callable[[List[Dict]], None]] = None,
+) -> Dict:
+    """Validate and write one chunk; on_imported gets the rows actually written"""
+    report = {"chunk": index, "first_line": rows[0][0], "rows": len(rows), "imported": 0, "errors": []}
+
+    valid: Dict[Tuple, Dict] = {}
+    for line, row in rows:
+        try:
+            record = kind.validate(row, columns)
+        except ValueError as e:
+            report["errors"].append({"line": line, "error": str(e)})
+            continue
+        # One statement cannot upsert the same key twice: the last row wins
+        valid[tuple(record[column] for column in kind.on_conflict)] = record
+
+    records = list(valid.values())
+    try:
+        if kind.table == "attendance_records":
+            for record in records:
+                record["created_at"] = record["check_in_time"]
+            records = await db.insert_records(records) if records else []
+            report["skipped"] = len(valid) - len(records)
+            # Inserted out of session order: the trigger's streaks are wrong until recomputed.
+            # Every valid row counts, as its insert may have landed in a run that failed before refreshing.
+            await db.refresh_student_stats(
+                sorted({record["session_id"] for record in valid.values()}),
+                sorted({record["student_email"] for record in valid.values()}),
+            )
+        else:
+            await db.upsert_rows(kind.table, records, kind.on_conflict)
+        report["imported"] = len(records)
+    except Exception as e:
+        report["failed"] = str(e)
+        return report
+
+    if on_imported is not None and records:
+        on_imported(records)
+    return report
+
+
+async def run_import(
+    db: AttendanceRepository,
+    kind_name: str,
+    stream: TextIO,
+    import_id: str,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    concurrency: int = IMPORT_CONCURRENCY,
+    on_progress: Optional[Callable[[Dict], None]] = None,
+    on_imported: Optional[Callable[[List[Dict]], None]] = None,
+) -> Dict:
+    """Import a CSV stream; chunks finished by an earlier run with the same import_id are skipped"""
+    kind = IMPORT_KINDS[kind_name]
+    state = ImportState(import_id, kind_name, chunk_size)
+    chunks = read_chunks(stream, chunk_size)
+    in_flight: set = set()
+    columns: Optional[List[str]] = None
+
+    async def run_chunk(index: int, rows: List[Tuple[int, Dict]]):
+        report = await import_chunk(db, kind, index, columns, rows, on_imported)
+        state.chunks[index] = report
+        if not report.get("failed"):
+            state.completed.add(index)
+        await state.save()
+        if on_progress is not None:
+            on_progress({
+                "chunks_done": len(state.chunks),
+                "imported_rows": sum(chunk["imported"] for chunk in state.chunks.values()),
+            })
+
+    while True:
+        # Read (in a thread) only as far ahead as there are free slots
+        item = await asyncio.to_thread(next, chunks, None)
+        if item is None:
+            break
+        index, header, rows = item
+        if columns is None:
+            columns = kind.columns(header)
+        if index in state.completed:
+            continue
+
+        in_flight.add(asyncio.create_task(run_chunk(index, rows)))
+        if len(in_flight) >= concurrency:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+
+    if in_flight:
+        for task in (await asyncio.wait(in_flight))[0]:
+            task.result()
+    return state.summary()
+
+
+def create_database() -> AttendanceRepository:
+    if os.getenv("DATABASE_BACKEND", "supabase").lower() == "sqlite":
+        from sqlite_database import SQLiteDatabase
+        return SQLiteDatabase(os.getenv("SQLITE_DATABASE_PATH", "attendance.db"))
+    from database import Database
+    return Database(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+
+
+async def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Bulk import attendance data from CSV")
+    parser.add_argument("kind", choices=sorted(IMPORT_KINDS))
+    parser.add_argument("csv_path")
+    parser.add_argument("--import-id", help="Checkpoint name; re-use it to resume (default: file name)")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--concurrency", type=int, default=IMPORT_CONCURRENCY)
+    args = parser.parse_args()
+
+    import_id = args.import_id or f"{args.kind}-{os.path.basename(args.csv_path)}"
+    db = create_database()
+    try:
+        with open(args.csv_path, newline="", encoding="utf-8-sig") as stream:
+            summary = await run_import(
+                db, args.kind, stream, import_id, args.chunk_size, args.concurrency,
+                on_progress=lambda progress: logger.info(f"Import {import_id}: {progress}"),
+            )
+    finally:
+        await db.close()
+
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,277 @@
+# camera_pipeline.py
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+import face_recognition
+
+from face_tracking import FaceTracker
+
+logger = logging.getLogger(__name__)
+
+# Motion gate configuration
+GATE_WIDTH = int(os.getenv("CAMERA_GATE_WIDTH", 160))
+GATE_PIXEL_THRESHOLD = int(os.getenv("CAMERA_GATE_PIXEL_THRESHOLD", 25))
+GATE_MOTION_RATIO = float(os.getenv("CAMERA_GATE_MOTION_RATIO", 0.01))
+GATE_USE_CASCADE = os.getenv("CAMERA_GATE_CASCADE", "false").lower() == "true"
+GATE_CASCADE_WIDTH = int(os.getenv("CAMERA_GATE_CASCADE_WIDTH", 480))
+# A still scene is still sent to detection this often, in case detection missed a face on the moving frame
+GATE_KEYFRAME_SECONDS = float(os.getenv("CAMERA_GATE_KEYFRAME_SECONDS", 5))
+
+# Smallest face (in pixels) the HOG detector finds without upsampling
+HOG_MIN_FACE_SIZE = int(os.getenv("HOG_MIN_FACE_SIZE", 80))
+
+
+def _resize_to_width(image, width: int):
+    """Downscale image to the given width, keeping aspect ratio"""
+    height, current_width = image.shape[:2]
+    if current_width <= width:
+        return image
+    scale = width / current_width
+    return cv2.resize(image, (width, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+
+class MotionGate:
+    """Cheap per-camera check that decides whether a frame is worth running dlib on"""
+
+    _cascade = None
+
+    def __init__(self, use_cascade: bool = GATE_USE_CASCADE, keyframe_seconds: float = GATE_KEYFRAME_SECONDS):
+        self.use_cascade = use_cascade
+        self.keyframe_seconds = keyframe_seconds
+        self.previous: Optional[np.ndarray] = None
+        self.last_passed_at: Optional[float] = None
+        self.frames = 0
+        self.passed = 0
+        self.keyframes = 0
+        self.skipped_motion = 0
+        self.skipped_cascade = 0
+        self.last_frame_at: Optional[float] = None
+
+    @classmethod
+    def cascade(cls):
+        if cls._cascade is None:
+            cls._cascade = cv2.CascadeClassifier(
+                cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+            )
+        return cls._cascade
+
+    def check(self, image, now: Optional[float] = None) -> bool:
+        """Return True if the frame changed enough (and looks like it has a face),
+        or if nothing has passed for keyframe_seconds"""
+        now = time.monotonic() if now is None else now
+        self.frames += 1
+        self.last_frame_at = time.time()
+
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        small = cv2.GaussianBlur(_resize_to_width(gray, GATE_WIDTH), (5, 5), 0)
+
+        previous = self.previous
+        self.previous = small
+
+        if self.keyframe_seconds and (self.last_passed_at is None or now - self.last_passed_at >= self.keyframe_seconds):
+            self.keyframes += 1
+            return self._pass(now)
+
+        if previous is not None and previous.shape == small.shape:
+            diff = cv2.absdiff(previous, small)
+            changed_ratio = np.count_nonzero(diff > GATE_PIXEL_THRESHOLD) / diff.size
+            if changed_ratio < GATE_MOTION_RATIO:
+                self.skipped_motion += 1
+                return False
+
+        if self.use_cascade:
+            faces = self.cascade().detectMultiScale(
+                _resize_to_width(gray, GATE_CASCADE_WIDTH),
+                scaleFactor=1.2,
+                minNeighbors=3,
+            )
+            if len(faces) == 0:
+                self.skipped_cascade += 1
+                return False
+
+        return self._pass(now)
+
+    def _pass(self, now: float) -> bool:
+        self.passed += 1
+        self.last_passed_at = now
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            "frames": self.frames,
+            "passed": self.passed,
+            "skipped_motion": self.skipped_motion,
+            "skipped_cascade": self.skipped_cascade,
+            "keyframes": self.keyframes,
+            "hit_rate": round(self.passed / self.frames, 3) if self.frames else 0.0,
+            "cascade_enabled": self.use_cascade,
+            "last_frame_at": self.last_frame_at,
+        }
+
+
+class DetectionRegion:
+    """Per-camera region of interest and expected face size range"""
+
+    def __init__(
+        self,
+        roi: Optional[List[float]] = None,
+        min_face_size: Optional[int] = None,
+        max_face_size: Optional[int] = None,
+    ):
+        # roi is [x, y, width, height] as fractions of the full frame
+        self.roi = roi
+        self.min_face_size = min_face_size
+        self.max_face_size = max_face_size
+
+    def crop(self, image):
+        """Crop image to the region. Returns (cropped image, (x offset, y offset))"""
+        if not self.roi:
+            return image, (0, 0)
+
+        height, width = image.shape[:2]
+        x, y, roi_width, roi_height = self.roi
+        left = max(0, min(width - 1, int(x * width)))
+        top = max(0, min(height - 1, int(y * height)))
+        right = max(left + 1, min(width, int((x + roi_width) * width)))
+        bottom = max(top + 1, min(height, int((y + roi_height) * height)))
+        return image[top:bottom, left:right], (left, top)
+
+    def detector_scale(self):
+        """Pick (resize scale, upsample count) so the smallest expected face stays detectable"""
+        if not self.min_face_size:
+            return 1.0, 1
+
+        scale = HOG_MIN_FACE_SIZE / self.min_face_size
+        upsample = 0
+        while scale > 1.0 and upsample < 2:
+            scale /= 2
+            upsample += 1
+        return min(scale, 1.0), upsample
+
+    def detect(self, rgb_image) -> List[tuple]:
+        """Run face_locations inside the region and return boxes in full-frame coordinates"""
+        cropped, (x_offset, y_offset) = self.crop(rgb_image)
+        scale, upsample = self.detector_scale()
+
+        if scale < 1.0:
+            cropped = cv2.resize(cropped, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        height, width = rgb_image.shape[:2]
+        locations = []
+        for top, right, bottom, left in face_recognition.face_locations(cropped, number_of_times_to_upsample=upsample):
+            top = max(0, int(top / scale) + y_offset)
+            right = min(width, int(right / scale) + x_offset)
+            bottom = min(height, int(bottom / scale) + y_offset)
+            left = max(0, int(left / scale) + x_offset)
+
+            if self.max_face_size and max(right - left, bottom - top) > self.max_face_size:
+                continue
+            locations.append((top, right, bottom, left))
+        return locations
+
+
+class CameraPipeline:
+    """Frame processing for one camera: gate, then detection and encoding"""
+
+    def __init__(self, camera_key: str):
+        self.camera_key = camera_key
+        self.gate = MotionGate()
+        self.region = DetectionRegion()
+        self.tracker = FaceTracker()
+        self.detections = 0
+        self.encodings = 0
+        self.lock = threading.Lock()
+
+    def configure_region(
+        self,
+        roi: Optional[List[float]] = None,
+        min_face_size: Optional[int] = None,
+        max_face_size: Optional[int] = None,
+    ):
+        self.region = DetectionRegion(roi, min_face_size, max_face_size)
+
+    def process_frame(self, image) -> Optional[List[Dict]]:
+        """Detect and encode faces in a BGR frame. Returns None when the gate skips it."""
+        with self.lock:
+            if not self.gate.check(image):
+                return None
+
+            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            face_locations = self.region.detect(rgb_image)
+            now = time.time()
+            tracks = self.tracker.update(face_locations, now)
+            self.detections += len(face_locations)
+
+            # Only new, stale or ambiguous tracks go through the ResNet encoder
+            to_encode = [track for track in tracks if track.needs_encoding(now)]
+            if to_encode:
+                encodings = face_recognition.face_encodings(rgb_image, [track.box for track in to_encode])
+                for track, encoding in zip(to_encode, encodings):
+                    track.encoding = encoding
+                    track.encoded_at = now
+                self.encodings += len(encodings)
+
+            return [
+                {
+                    "track_id": track.track_id,
+                    "face_location": track.box,
+                    "face_encoding": track.encoding,
+                    "identity": track.identity,
+                    "encoded": track in to_encode,
+                }
+                for track in tracks
+                if track.encoding is not None
+            ]
+
+    def assign_identity(self, track_id: int, identity: Optional[str], distance: Optional[float], ambiguous: bool):
+        """Remember who a track was matched to, so later frames can reuse it"""
+        with self.lock:
+            track = self.tracker.tracks.get(track_id)
+            if track is None:
+                return
+            track.identity = identity
+            track.distance = distance
+            track.ambiguous = ambiguous
+
+    def stats(self) -> Dict:
+        return {
+            "camera": self.camera_key,
+            "gate": self.gate.stats(),
+            "tracker": {
+                "active_tracks": len(self.tracker.tracks),
+                "detections": self.detections,
+                "encodings": self.encodings,
+                "encodings_saved": self.detections - self.encodings,
+            },
+            "region": {
+                "roi": self.region.roi,
+                "min_face_size": self.region.min_face_size,
+                "max_face_size": self.region.max_face_size,
+            },
+        }
+
+
+_pipelines: Dict[str, CameraPipeline] = {}
+_pipelines_lock = threading.Lock()
+
+
+def get_camera_pipeline(camera_key: str) -> CameraPipeline:
+    """Get (or create) the pipeline for a camera"""
+    with _pipelines_lock:
+        pipeline = _pipelines.get(camera_key)
+        if pipeline is None:
+            pipeline = CameraPipeline(camera_key)
+            _pipelines[camera_key] = pipeline
+        return pipeline
+
+
+def camera_pipeline_stats() -> List[Dict]:
+    """Gate statistics for every camera seen so far"""
+    with _pipelines_lock:
+        pipelines = list(_pipelines.values())
+    return [pipeline.stats() for pipeline in pipelines]
@@ -0,0 +1,555 @@
+# database.py
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from repository import AttendanceRepository
+
+logger = logging.getLogger(__name__)
+
+# Data access configuration
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", 10))
+DB_MAX_RETRIES = int(os.getenv("DB_MAX_RETRIES", 3))
+DB_RETRY_BACKOFF = float(os.getenv("DB_RETRY_BACKOFF", 0.2))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", 20))
+DB_DEGRADED_AFTER_FAILURES = int(os.getenv("DB_DEGRADED_AFTER_FAILURES", 3))
+DB_DEGRADED_COOLDOWN = float(os.getenv("DB_DEGRADED_COOLDOWN", 30))
+
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+# Resending these cannot apply a write twice
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+
+# Raised before the request reached the server, so any request can be resent
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+# PostgREST answers constraint and invalid-input errors with these
+REJECTED_STATUS_CODES = {400, 409, 422}
+
+
+class DatabaseError(Exception):
+    """Raised when a query fails after all retries"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def transient(self) -> bool:
+        """The upstream was unreachable or failed, as opposed to rejecting the query"""
+        return self.status_code is None or self.status_code >= 500
+
+    @property
+    def rejected(self) -> bool:
+        """The data itself was refused (constraint, foreign key, invalid value): resending cannot succeed"""
+        return self.status_code in REJECTED_STATUS_CODES
+
+
+class UpstreamHealth:
+    """Marks the database degraded after consecutive failures, until a cooldown passes.
+
+    While degraded, callers can skip the upstream instead of waiting out
+    timeouts and retries; the next call after the cooldown probes it again.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.last_failure = 0.0
+        self.last_error: Optional[str] = None
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.last_error = None
+
+    def record_failure(self, error: str):
+        self.consecutive_failures += 1
+        self.last_failure = time.monotonic()
+        self.last_error = error
+
+    @property
+    def degraded(self) -> bool:
+        return (
+            self.consecutive_failures >= self.failure_threshold
+            and time.monotonic() - self.last_failure < self.cooldown
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            "degraded": self.degraded,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+        }
+
+
+class QueryMetrics:
+    """Latency counters for one named query"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def observe(self, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.last_ms = elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 1),
+            "last_ms": round(self.last_ms, 1),
+        }
+
+
+def in_filter(values: List[str]) -> str:
+    """PostgREST in.(...) filter with quoted values"""
+    quoted = ",".join('"' + str(value).replace('"', '\\"') + '"' for value in values)
+    return f"in.({quoted})"
+
+
+class Database(AttendanceRepository):
+    """Async access to the Supabase REST API over one pooled HTTP/2 client"""
+
+    def __init__(self, url: str, key: str):
+        self.url = url.rstrip("/")
+        self.key = key
+        self._client: Optional[httpx.AsyncClient] = None
+        self._metrics: Dict[str, QueryMetrics] = {}
+        self.health = UpstreamHealth(DB_DEGRADED_AFTER_FAILURES, DB_DEGRADED_COOLDOWN)
+
+    @property
+    def degraded(self) -> bool:
+        return self.health.degraded
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.url}/rest/v1",
+                http2=True,
+                timeout=DB_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=DB_MAX_CONNECTIONS,
+                    max_keepalive_connections=DB_MAX_CONNECTIONS,
+                ),
+                headers={
+                    "apikey": self.key,
+                    "Authorization": f"Bearer {self.key}",
+                    "Content-Type": "application/json",
+                },
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def metrics(self) -> Dict:
+        return {name: metrics.to_dict() for name, metrics in sorted(self._metrics.items())}
+
+    async def _request(
+        self,
+        name: str,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, str]] = None,
+        json: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        raw: bool = False,
+        idempotent: Optional[bool] = None,
+    ) -> Any:
+        """Send one query, retrying transient failures with exponential backoff.
+
+        A request that may have reached the server (a timeout, a 502/504) is
+        only resent if it is idempotent: GET/HEAD by default, or writes the
+        caller marks as safe to repeat. Other writes are resent only when the
+        connection failed before anything was sent, or on 429.
+        """
+        metrics = self._metrics.setdefault(name, QueryMetrics())
+        started = time.perf_counter()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+
+        for attempt in range(DB_MAX_RETRIES + 1):
+            try:
+                response = await self.client.request(method, path, params=params, json=json, headers=headers)
+                if (
+                    response.status_code in RETRY_STATUS_CODES
+                    and attempt < DB_MAX_RETRIES
+                    and (idempotent or response.status_code == 429)
+                ):
+                    raise httpx.HTTPStatusError("Retryable status", request=response.request, response=response)
+                break
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = idempotent or isinstance(e, (httpx.HTTPStatusError, *NOT_SENT_ERRORS))
+                if attempt >= DB_MAX_RETRIES or not retryable:
+                    metrics.errors += 1
+                    self.health.record_failure(f"{name}: {e}")
+                    raise DatabaseError(f"{name} failed: {e}")
+                metrics.retries += 1
+                await asyncio.sleep(DB_RETRY_BACKOFF * (2 ** attempt))
+
+        metrics.observe((time.perf_counter() - started) * 1000)
+
+        if response.status_code >= 500:
+            self.health.record_failure(f"{name}: HTTP {response.status_code}")
+        else:
+            self.health.record_success()
+
+        if response.status_code >= 400:
+            metrics.errors += 1
+            raise DatabaseError(f"{name} failed: {response.text}", response.status_code)
+
+        if raw:
+            return response
+        if not response.content:
+            return None
+        return response.json()
+
+    async def select(self, name: str, table: str, params: Dict[str, str]) -> List[Dict]:
+        return await self._request(name, "GET", f"/{table}", params=params)
+
+    async def insert(self, name: str, table: str, rows: Any) -> List[Dict]:
+        return await self._request(
+            name, "POST", f"/{table}", json=rows, headers={"Prefer": "return=representation"}
+        )
+
+    async def update(self, name: str, table: str, params: Dict[str, str], data: Dict) -> List[Dict]:
+        # Sets fixed values, so applying it twice is harmless
+        return await self._request(
+            name, "PATCH", f"/{table}", params=params, json=data, headers={"Prefer": "return=representation"},
+            idempotent=True,
+        )
+
+    async def rpc(self, function: str, params: Dict, idempotent: bool = False) -> Any:
+        return await self._request(f"rpc.{function}", "POST", f"/rpc/{function}", json=params, idempotent=idempotent)
+
+    # Sessions
+    async def get_active_session(self, session_id: str) -> Optional[Dict]:
+        rows = await self.select("sessions.get_active", "attendance_sessions", {
+            "select": "*",
+            "id": f"eq.{session_id}",
+            "status": "eq.active",
+        })
+        return rows[0] if rows else None
+
+    async def class_has_active_session(self, class_id: str) -> bool:
+        rows = await self.select("sessions.class_active", "attendance_sessions", {
+            "select": "id",
+            "class_id": f"eq.{class_id}",
+            "status": "eq.active",
+            "limit": "1",
+        })
+        return bool(rows)
+
+    async def create_session(self, data: Dict) -> Dict:
+        rows = await self.insert("sessions.create", "attendance_sessions", data)
+        return rows[0]
+
+    async def end_session(self, session_id: str, updated_at: str) -> Optional[Dict]:
+        rows = await self.update("sessions.end", "attendance_sessions", {"id": f"eq.{session_id}"}, {
+            "status": "ended",
+            "updated_at": updated_at,
+        })
+        return rows[0] if rows else None
+
+    async def end_sessions(self, session_ids: List[str], updated_at: str) -> List[Dict]:
+        """End the given sessions that are still active; returns the ones that were ended"""
+        if not session_ids:
+            return []
+        return await self.update("sessions.end_many", "attendance_sessions", {
+            "id": in_filter(session_ids),
+            "status": "eq.active",
+        }, {
+            "status": "ended",
+            "updated_at": updated_at,
+        })
+
+    async def get_active_sessions(self, select: str = "*") -> List[Dict]:
+        return await self.select("sessions.active", "attendance_sessions", {
+            "select": select,
+            "status": "eq.active",
+        })
+
+    async def set_session_webcam_config(self, session_id: str, webcam_config: Optional[Dict]):
+        if webcam_config is None:
+            await self._request(
+                "session_cameras.delete", "DELETE", "/session_cameras",
+                params={"session_id": f"eq.{session_id}"}, idempotent=True,
+            )
+            return
+        await self.upsert_rows("session_cameras", [{
+            "session_id": session_id,
+            "webcam_config": webcam_config,
+            "updated_at": datetime.now().isoformat(),
+        }], ["session_id"])
+
+    async def get_session_webcam_configs(self, session_ids: List[str]) -> Dict[str, Dict]:
+        if not session_ids:
+            return {}
+        rows = await self.select("session_cameras.get", "session_cameras", {
+            "select": "session_id,webcam_config",
+            "session_id": in_filter(session_ids),
+        })
+        return {row["session_id"]: row["webcam_config"] for row in rows}
+
+    # Check-in
+    async def checkin_context(self, session_id: str, student_email: str) -> Dict:
+        return await self.rpc("checkin_context", {
+            "p_session_id": session_id,
+            "p_student_email": student_email,
+        }, idempotent=True)
+
+    async def record_checkin(
+        self,
+        session_id: str,
+        student_email: str,
+        student_id: str,
+        check_in_time: str,
+        status: str,
+        face_match_score: Optional[float],
+    ) -> Dict:
+        return await self.rpc("record_checkin", {
+            "p_session_id": session_id,
+            "p_student_email": student_email,
+            "p_student_id": student_id,
+            "p_check_in_time": check_in_time,
+            "p_status": status,
+            "p_face_match_score": face_match_score,
+        })
+
+    async def mark_absent_students(self, session_id: str) -> int:
+        return await self.rpc("mark_absent_students", {"p_session_id": session_id})
+
+    async def get_sessions_pending_absent(self) -> List[Dict]:
+        return await self.select("sessions.pending_absent", "attendance_sessions", {
+            "select": "id",
+            "status": "eq.ended",
+            "absent_marked_at": "is.null",
+            "limit": "100",
+        })
+
+    # Records
+    async def get_session_records(self, session_id: str, select: str = "*") -> List[Dict]:
+        return await self.select("records.by_session", "attendance_records", {
+            "select": select,
+            "session_id": f"eq.{session_id}",
+            "order": "check_in_time.asc",
+        })
+
+    async def get_session_records_page(
+        self,
+        session_id: str,
+        select: str,
+        limit: int,
+        after: Optional[Dict] = None,
+    ) -> List[Dict]:
+        # Read-only, so safe to resend
+        rows = await self._request(
+            "records.page",
+            "POST",
+            "/rpc/get_session_records_page",
+            params={"select": select},
+            json={
+                "p_session_id": session_id,
+                "p_after_txid": after["txid"] if after else 0,
+                "p_after_seq": after["seq"] if after else 0,
+                "p_limit": limit,
+            },
+            idempotent=True,
+        )
+        # xid8 comes back as text
+        for row in rows:
+            row["txid"] = int(row["txid"])
+        return rows
+
+    async def get_class_records_page(
+        self,
+        class_id: str,
+        select: str,
+        start: str,
+        end: str,
+        limit: int,
+        after: Optional[Dict] = None,
+    ) -> List[Dict]:
+        """Records of the class's sessions started in [start, end), in (created_at, id) order"""
+        params = {
+            "select": f"{select},attendance_sessions!inner(start_time)",
+            "attendance_sessions.class_id": f"eq.{class_id}",
+            "attendance_sessions.and": f'(start_time.gte."{start}",start_time.lt."{end}")',
+            "order": "created_at.asc,id.asc",
+            "limit": str(limit),
+        }
+        if after:
+            created_at = after["created_at"]
+            params["or"] = (
+                f'(created_at.gt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.gt."{after["id"]}"))'
+            )
+        return await self.select("records.class_page", "attendance_records", params)
+
+    async def get_checked_in_emails(self, session_id: str) -> List[str]:
+        rows = await self.select("records.emails", "attendance_records", {
+            "select": "student_email",
+            "session_id": f"eq.{session_id}",
+        })
+        return [row["student_email"] for row in rows]
+
+    async def insert_records(self, records: List[Dict]) -> List[Dict]:
+        """Insert records, skipping any (session_id, student_email) that already exists"""
+        return await self._request(
+            "records.insert",
+            "POST",
+            "/attendance_records",
+            params={"on_conflict": "session_id,student_email"},
+            json=records,
+            headers={"Prefer": "resolution=ignore-duplicates,return=representation"},
+            idempotent=True,
+        )
+
+    async def set_record_image_url(self, session_id: str, student_email: str, url: str) -> bool:
+        rows = await self.update("records.image_url", "attendance_records", {
+            "session_id": f"eq.{session_id}",
+            "student_email": f"eq.{student_email}",
+        }, {"webcam_image_url": url})
+        return bool(rows)
+
+    async def upsert_rows(self, table: str, rows: List[Dict], on_conflict: List[str]):
+        if not rows:
+            return
+        await self._request(
+            f"{table}.upsert",
+            "POST",
+            f"/{table}",
+            params={"on_conflict": ",".join(on_conflict)},
+            json=rows,
+            headers={"Prefer": "resolution=merge-duplicates,return=minimal"},
+            idempotent=True,
+        )
+
+    # Users
+    async def get_school_id(self, email: str) -> Optional[str]:
+        rows = await self.select("users.school_id", "users", {
+            "select": "school_id",
+            "email": f"eq.{email}",
+            "limit": "1",
+        })
+        return rows[0]["school_id"] if rows else None
+
+    # Class students
+    async def get_class_roster(self, class_id: str) -> List[Dict]:
+        """Roster rows as {"student_email", "users": {"school_id"}}"""
+        return await self.select("class_students.roster", "class_students", {
+            "select": "student_email,users!inner(school_id)",
+            "class_id": f"eq.{class_id}",
+        })
+
+    async def count_class_students(self, class_id: str) -> int:
+        response = await self._request("class_students.count", "HEAD", "/class_students", params={
+            "class_id": f"eq.{class_id}",
+        }, headers={"Prefer": "count=exact"}, raw=True)
+        # Content-Range: 0-24/25 (or */0)
+        return int(response.headers.get("content-range", "*/0").split("/")[-1])
+
+    # Embeddings
+    async def get_face_embedding(self, student_id: str) -> Optional[str]:
+        rows = await self.select("embeddings.get", "student_face_embeddings", {
+            "select": "face_embedding_json",
+            "student_id": f"eq.{student_id}",
+            "is_active": "eq.true",
+            "limit": "1",
+        })
+        return rows[0]["face_embedding_json"] if rows else None
+
+    async def get_face_embeddings(self, student_ids: List[str]) -> List[Dict]:
+        if not student_ids:
+            return []
+        return await self.select("embeddings.get_many", "student_face_embeddings", {
+            "select": "student_id,face_embedding_json",
+            "student_id": in_filter(student_ids),
+            "is_active": "eq.true",
+        })
+
+    async def get_face_embeddings_page(self, limit: int, after_student_id: Optional[str] = None) -> List[Dict]:
+        params = {
+            "select": "student_id,face_embedding_json",
+            "is_active": "eq.true",
+            "order": "student_id.asc",
+            "limit": str(limit),
+        }
+        if after_student_id is not None:
+            params["student_id"] = f'gt."{after_student_id}"'
+        return await self.select("embeddings.page", "student_face_embeddings", params)
+
+    async def save_face_embedding(self, student_id: str, data: Dict) -> Dict:
+        """Update the student's embedding row, or insert one if there is none"""
+        rows = await self.update("embeddings.update", "student_face_embeddings", {
+            "student_id": f"eq.{student_id}",
+        }, data)
+        if rows:
+            return rows[0]
+        rows = await self.insert("embeddings.insert", "student_face_embeddings", data)
+        return rows[0]
+
+    # Analytics
+    async def get_class_stats(self, class_id: str) -> Optional[Dict]:
+        rows = await self.select("analytics.class", "class_attendance_stats", {
+            "select": "*",
+            "class_id": f"eq.{class_id}",
+        })
+        return rows[0] if rows else None
+
+    async def get_class_session_stats(self, class_id: str, limit: int) -> List[Dict]:
+        return await self.select("analytics.sessions", "session_attendance_stats", {
+            "select": "*",
+            "class_id": f"eq.{class_id}",
+            "order": "started_at.desc",
+            "limit": str(limit),
+        })
+
+    async def get_class_student_stats(self, class_id: str) -> List[Dict]:
+        return await self.select("analytics.class_students", "student_attendance_stats", {
+            "select": "*",
+            "class_id": f"eq.{class_id}",
+            "order": "student_email.asc",
+        })
+
+    async def get_session_stats(self, session_ids: List[str]) -> List[Dict]:
+        if not session_ids:
+            return []
+        return await self.select("analytics.session_many", "session_attendance_stats", {
+            "select": "session_id,present_count,late_count,absent_count",
+            "session_id": in_filter(session_ids),
+        })
+
+    async def get_student_stats(self, student_email: str) -> List[Dict]:
+        return await self.select("analytics.student", "student_attendance_stats", {
+            "select": "*",
+            "student_email": f"eq.{student_email}",
+        })
+
+    async def refresh_student_stats(self, session_ids: List[str], student_emails: List[str]) -> int:
+        if not session_ids or not student_emails:
+            return 0
+        # A recompute, so safe to retry
+        return await self.rpc("refresh_student_attendance_stats", {
+            "p_session_ids": session_ids,
+            "p_student_emails": student_emails,
+        }, idempotent=True)
@@ -0,0 +1,151 @@
+# events.py
+import json
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class Event:
+    def __init__(self, event_id: int, event_type: str, data: Dict):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+
+    def to_sse(self) -> str:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n"
+
+
+# Put on a subscriber queue to end its stream
+_CLOSE = object()
+
+
+def _close(queue: asyncio.Queue):
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(_CLOSE)
+
+
+class Channel:
+    """Events for one session: a short replay history plus live subscribers"""
+
+    def __init__(self, history_size: int):
+        self.next_id = 1
+        self.history: Deque[Event] = deque(maxlen=history_size)
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.closed = False
+
+
+class SessionEventHub:
+    """Fans each committed attendance event out to every viewer of the session"""
+
+    def __init__(
+        self,
+        history_size: int = 500,
+        queue_size: int = 1000,
+        heartbeat_seconds: float = 15,
+        retention_seconds: float = 300,
+    ):
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.retention_seconds = retention_seconds
+        self.channels: Dict[str, Channel] = {}
+        self.published = 0
+
+    def has_channel(self, session_id: str) -> bool:
+        return session_id in self.channels
+
+    def _channel(self, session_id: str) -> Channel:
+        channel = self.channels.get(session_id)
+        if channel is None:
+            channel = Channel(self.history_size)
+            self.channels[session_id] = channel
+        return channel
+
+    def publish(self, session_id: str, event_type: str, data: Dict) -> int:
+        channel = self._channel(session_id)
+        event = Event(channel.next_id, event_type, data)
+        channel.next_id += 1
+        channel.history.append(event)
+        self.published += 1
+
+        for queue in list(channel.subscribers):
+            if queue.full():
+                # Too slow: end its stream, the client resumes from its last event id
+                channel.subscribers.discard(queue)
+                _close(queue)
+            else:
+                queue.put_nowait(event)
+        return event.id
+
+    def end(self, session_id: str, data: Dict):
+        """Publish session_ended, close live streams and forget the channel later. Ending twice is a no-op."""
+        channel = self.channels.get(session_id)
+        if channel is not None and channel.closed:
+            return
+        self.publish(session_id, "session_ended", data)
+        channel = self.channels[session_id]
+        channel.closed = True
+        for queue in channel.subscribers:
+            if queue.full():
+                _close(queue)
+            else:
+                # Let the stream drain, session_ended included, before it ends
+                queue.put_nowait(_CLOSE)
+        channel.subscribers.clear()
+
+        def forget():
+            if self.channels.get(session_id) is channel:
+                del self.channels[session_id]
+
+        asyncio.get_running_loop().call_later(self.retention_seconds, forget)
+
+    async def subscribe(self, session_id: str, last_event_id: Optional[int] = None) -> AsyncIterator[Optional[Event]]:
+        """Yield events after last_event_id, then live ones. Yields None as a heartbeat."""
+        channel = self._channel(session_id)
+
+        backlog = []
+        if last_event_id is not None:
+            if last_event_id >= channel.next_id:
+                # Ids from before a server restart: replay everything we have
+                backlog = list(channel.history)
+            else:
+                if channel.history and channel.history[0].id > last_event_id + 1:
+                    backlog.append(Event(0, "reset", {"reason": "history_truncated"}))
+                backlog.extend(event for event in channel.history if event.id > last_event_id)
+
+        if channel.closed:
+            if not backlog:
+                # A fresh subscriber still needs to hear that the session is over
+                backlog = [event for event in channel.history if event.type == "session_ended"][-1:]
+            for event in backlog:
+                yield event
+            return
+
+        # Register before replaying so nothing published meanwhile is missed
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        channel.subscribers.add(queue)
+        try:
+            for event in backlog:
+                yield event
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event is _CLOSE:
+                    return
+                yield event
+        finally:
+            channel.subscribers.discard(queue)
+
+    def stats(self) -> Dict:
+        return {
+            "channels": len(self.channels),
+            "subscribers": sum(len(channel.subscribers) for channel in self.channels.values()),
+            "published": self.published,
+        }
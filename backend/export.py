@@ -0,0 +1,126 @@
+# export.py
+import csv
+import io
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet exports are optional
+    pa = None
+    pq = None
+
+EXPORT_COLUMNS = [
+    "session_id", "session_start", "student_email", "school_id", "full_name",
+    "check_in_time", "status", "face_match_score"
+]
+
+FetchPage = Callable[[int, Optional[Dict]], Awaitable[List[Dict]]]
+
+
+def parquet_available() -> bool:
+    return pq is not None
+
+
+async def iter_pages(fetch_page: FetchPage, page_size: int) -> AsyncIterator[List[Dict]]:
+    """Keyset-paginate with fetch_page(limit, after), fetching the next page while
+    the current one is being written. At most two pages are held in memory."""
+    pending = asyncio.create_task(fetch_page(page_size, None))
+    try:
+        while True:
+            rows = await pending
+            pending = None
+            if len(rows) == page_size:
+                after = {"created_at": rows[-1]["created_at"], "id": rows[-1]["id"]}
+                pending = asyncio.create_task(fetch_page(page_size, after))
+            if rows:
+                yield rows
+            if pending is None:
+                return
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+def flatten_record(row: Dict) -> Dict:
+    session = row.get("attendance_sessions") or {}
+    user = row.get("users") or {}
+    return {
+        "session_id": row.get("session_id"),
+        "session_start": session.get("start_time"),
+        "student_email": row.get("student_email"),
+        "school_id": user.get("school_id"),
+        "full_name": user.get("full_name"),
+        "check_in_time": row.get("check_in_time"),
+        "status": row.get("status"),
+        "face_match_score": row.get("face_match_score"),
+    }
+
+
+async def csv_stream(pages: AsyncIterator[List[Dict]]) -> AsyncIterator[bytes]:
+    """One CSV chunk per page, starting with the header"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    yield buffer.getvalue().encode()
+
+    async for rows in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(flatten_record(row) for row in rows)
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last take()"""
+
+    mode = "wb"
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Parquet footers record absolute offsets, so report the total written
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+async def parquet_stream(pages: AsyncIterator[List[Dict]]) -> AsyncIterator[bytes]:
+    """One Parquet row group per page; the footer is sent last"""
+    schema = pa.schema(
+        [(column, pa.string()) for column in EXPORT_COLUMNS if column != "face_match_score"]
+        + [("face_match_score", pa.float64())]
+    )
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="snappy")
+    try:
+        async for rows in pages:
+            flat = [flatten_record(row) for row in rows]
+            table = pa.Table.from_pydict(
+                {column: [row[column] for row in flat] for column in schema.names},
+                schema=schema,
+            )
+            writer.write_table(table)
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
@@ -0,0 +1,87 @@
+# face_tracking.py
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Face tracker configuration
+TRACK_IOU_THRESHOLD = float(os.getenv("TRACK_IOU_THRESHOLD", 0.3))
+TRACK_REENCODE_SECONDS = float(os.getenv("TRACK_REENCODE_SECONDS", 10))
+TRACK_MAX_AGE_SECONDS = float(os.getenv("TRACK_MAX_AGE_SECONDS", 5))
+
+
+def box_iou(box_a, box_b) -> float:
+    """Intersection over union of two (top, right, bottom, left) boxes"""
+    top = max(box_a[0], box_b[0])
+    right = min(box_a[1], box_b[1])
+    bottom = min(box_a[2], box_b[2])
+    left = max(box_a[3], box_b[3])
+    if right <= left or bottom <= top:
+        return 0.0
+
+    intersection = (right - left) * (bottom - top)
+    area_a = (box_a[1] - box_a[3]) * (box_a[2] - box_a[0])
+    area_b = (box_b[1] - box_b[3]) * (box_b[2] - box_b[0])
+    return intersection / float(area_a + area_b - intersection)
+
+
+class FaceTrack:
+    """A face followed across frames, with its last encoding and identity"""
+
+    def __init__(self, track_id: int, box, now: float):
+        self.track_id = track_id
+        self.box = box
+        self.first_seen = now
+        self.last_seen = now
+        self.encoding: Optional[np.ndarray] = None
+        self.encoded_at: Optional[float] = None
+        self.identity: Optional[str] = None
+        self.distance: Optional[float] = None
+        self.ambiguous = False
+
+    def needs_encoding(self, now: float) -> bool:
+        if self.encoding is None or self.ambiguous:
+            return True
+        return now - self.encoded_at >= TRACK_REENCODE_SECONDS
+
+
+class FaceTracker:
+    """IoU based tracker that carries encodings forward between frames"""
+
+    def __init__(self):
+        self.tracks: Dict[int, FaceTrack] = {}
+        self.next_id = 1
+
+    def update(self, face_locations: List[tuple], now: float) -> List[FaceTrack]:
+        """Match detections to existing tracks. Returns one track per detection, in order."""
+        # Drop tracks that have not been seen for a while
+        for track_id in [t.track_id for t in self.tracks.values() if now - t.last_seen > TRACK_MAX_AGE_SECONDS]:
+            del self.tracks[track_id]
+
+        # Greedy matching, best overlap first
+        candidates = []
+        for index, box in enumerate(face_locations):
+            for track in self.tracks.values():
+                iou = box_iou(box, track.box)
+                if iou >= TRACK_IOU_THRESHOLD:
+                    candidates.append((iou, index, track.track_id))
+        candidates.sort(reverse=True)
+
+        matched: List[Optional[FaceTrack]] = [None] * len(face_locations)
+        used_tracks = set()
+        for _, index, track_id in candidates:
+            if matched[index] is not None or track_id in used_tracks:
+                continue
+            matched[index] = self.tracks[track_id]
+            used_tracks.add(track_id)
+
+        for index, box in enumerate(face_locations):
+            track = matched[index]
+            if track is None:
+                track = FaceTrack(self.next_id, box, now)
+                self.tracks[track.track_id] = track
+                self.next_id += 1
+                matched[index] = track
+            track.box = box
+            track.last_seen = now
+        return matched
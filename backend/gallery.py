@@ -0,0 +1,132 @@
+# gallery.py
+import json
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# fetch_page(limit, after_student_id) -> [{"student_id", "face_embedding_json"}] ordered by student_id
+FetchPage = Callable[[int, Optional[str]], Awaitable[List[Dict]]]
+
+
+class FaceGallery:
+    """Every active face embedding in one float32 matrix, for nearest-neighbour search.
+
+    Distances use |a - b|^2 = |a|^2 + |b|^2 - 2 a.b with the gallery's squared
+    norms precomputed, so a search is one matrix-vector product. Rows are kept
+    in a buffer that doubles when full, so registrations append in place.
+    """
+
+    def __init__(self, dimensions: int = 128, page_size: int = 1000):
+        self.dimensions = dimensions
+        self.page_size = page_size
+        self.student_ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.embeddings = np.zeros((0, dimensions), dtype=np.float32)
+        self.norms = np.zeros(0, dtype=np.float32)
+        self.size = 0
+        self._load_task: Optional[asyncio.Task] = None
+        self._fetch_page: Optional[FetchPage] = None
+        self.load_failures = 0
+        self.last_error: Optional[str] = None
+        self.load_ms = 0.0
+        self.searches = 0
+        self.total_search_ms = 0.0
+
+    def start_loading(self, fetch_page: FetchPage):
+        self._fetch_page = fetch_page
+        self._load_task = asyncio.create_task(self._load(fetch_page))
+
+    async def _load(self, fetch_page: FetchPage):
+        started = time.perf_counter()
+        after = None
+        try:
+            while True:
+                rows = await fetch_page(self.page_size, after)
+                for row in rows:
+                    self.upsert(row["student_id"], json.loads(row["face_embedding_json"]))
+                if len(rows) < self.page_size:
+                    break
+                after = rows[-1]["student_id"]
+        except Exception as e:
+            self.load_failures += 1
+            self.last_error = str(e)
+            raise
+        self.load_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Face gallery loaded {self.size} embeddings in {self.load_ms:.0f} ms")
+
+    async def ready(self) -> bool:
+        """Wait for the load; a failed load is restarted by the next call. False if
+        this attempt failed (or loading was never started)"""
+        if self._load_task is None:
+            return False
+        task = self._load_task
+        if task.done() and not task.cancelled() and task.exception() is not None:
+            # Rows already loaded stay; upserts make reloading them harmless
+            logger.info(f"Retrying face gallery load after: {task.exception()}")
+            task = self._load_task = asyncio.create_task(self._load(self._fetch_page))
+        try:
+            await asyncio.shield(task)
+            return True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Face gallery failed to load: {e}")
+            return False
+
+    def upsert(self, student_id: str, encoding):
+        vector = np.asarray(encoding, dtype=np.float32)
+        row = self.index.get(student_id)
+        if row is None:
+            if self.size == len(self.embeddings):
+                capacity = max(1024, 2 * len(self.embeddings))
+                embeddings = np.zeros((capacity, self.dimensions), dtype=np.float32)
+                embeddings[:self.size] = self.embeddings[:self.size]
+                norms = np.zeros(capacity, dtype=np.float32)
+                norms[:self.size] = self.norms[:self.size]
+                self.embeddings, self.norms = embeddings, norms
+            row = self.size
+            self.size += 1
+            self.index[student_id] = row
+            self.student_ids.append(student_id)
+        self.embeddings[row] = vector
+        self.norms[row] = vector @ vector
+
+    def nearest(self, encoding, k: int = 3, exclude: Optional[str] = None) -> List[Dict]:
+        """The k closest other students, closest first"""
+        if not self.size:
+            return []
+        started = time.perf_counter()
+        query = np.asarray(encoding, dtype=np.float32)
+        embeddings = self.embeddings[:self.size]
+        squared = self.norms[:self.size] + query @ query - 2 * (embeddings @ query)
+        if exclude is not None and exclude in self.index:
+            squared[self.index[exclude]] = np.inf
+
+        k = min(k, self.size)
+        candidates = np.argpartition(squared, k - 1)[:k]
+        candidates = candidates[np.argsort(squared[candidates])]
+
+        self.searches += 1
+        self.total_search_ms += (time.perf_counter() - started) * 1000
+        return [
+            {"student_id": self.student_ids[row], "distance": round(float(np.sqrt(max(squared[row], 0.0))), 4)}
+            for row in candidates
+            if np.isfinite(squared[row])
+        ]
+
+    def stats(self) -> Dict:
+        return {
+            "size": self.size,
+            "loaded": self._load_task is not None and self._load_task.done() and not self._load_task.cancelled()
+            and self._load_task.exception() is None,
+            "load_ms": round(self.load_ms, 1),
+            "load_failures": self.load_failures,
+            "last_error": self.last_error,
+            "searches": self.searches,
+            "avg_search_ms": round(self.total_search_ms / self.searches, 3) if self.searches else 0.0,
+        }
@@ -0,0 +1,80 @@
+-- 001_checkin_procedures.sql
+-- Check-in in two round-trips: one to load everything the handler needs,
+-- one to do the duplicate check and insert atomically.
+-- Run in the Supabase SQL editor (or psql) before deploying the backend.
+
+-- Session, duplicate flag, student id and stored face embedding in one call
+create or replace function public.checkin_context(p_session_id uuid, p_student_email text)
+returns jsonb
+language sql
+stable
+as $$
+  select jsonb_build_object(
+    'session', (
+      select to_jsonb(s)
+      from attendance_sessions s
+      where s.id = p_session_id and s.status = 'active'
+    ),
+    'already_checked_in', exists (
+      select 1
+      from attendance_records r
+      where r.session_id = p_session_id and r.student_email = p_student_email
+    ),
+    'student_id', (
+      select u.school_id
+      from users u
+      where u.email = p_student_email
+      limit 1
+    ),
+    'face_embedding_json', (
+      select e.face_embedding_json
+      from users u
+      join student_face_embeddings e on e.student_id = u.school_id
+      where u.email = p_student_email and e.is_active
+      limit 1
+    )
+  );
+$$;
+
+-- Duplicate check + insert under a per-student transaction lock
+create or replace function public.record_checkin(
+  p_session_id uuid,
+  p_student_email text,
+  p_student_id text,
+  p_check_in_time timestamptz,
+  p_status text,
+  p_face_match_score double precision
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_record attendance_records;
+begin
+  perform pg_advisory_xact_lock(hashtext(p_session_id::text || ':' || p_student_email));
+
+  if exists (
+    select 1
+    from attendance_records
+    where session_id = p_session_id and student_email = p_student_email
+  ) then
+    return jsonb_build_object('inserted', false);
+  end if;
+
+  insert into attendance_records (
+    session_id, student_email, student_id, check_in_time, status, face_match_score, created_at
+  )
+  values (
+    p_session_id, p_student_email, p_student_id, p_check_in_time, p_status, p_face_match_score, p_check_in_time
+  )
+  returning * into v_record;
+
+  return jsonb_build_object('inserted', true, 'record', to_jsonb(v_record));
+end;
+$$;
+
+create index if not exists attendance_records_session_student_idx
+  on attendance_records (session_id, student_email);
+
+create index if not exists attendance_sessions_class_status_idx
+  on attendance_sessions (class_id, status);
@@ -0,0 +1,46 @@
+-- 002_unique_attendance_records.sql
+-- One attendance record per student per session, enforced by the database.
+
+-- Keep the earliest record if duplicates were created before this migration
+delete from attendance_records r
+using attendance_records d
+where r.session_id = d.session_id
+  and r.student_email = d.student_email
+  and (r.created_at, r.id::text) > (d.created_at, d.id::text);
+
+drop index if exists attendance_records_session_student_idx;
+
+create unique index if not exists attendance_records_session_student_key
+  on attendance_records (session_id, student_email);
+
+-- The unique index makes the insert itself idempotent; no lock needed
+create or replace function public.record_checkin(
+  p_session_id uuid,
+  p_student_email text,
+  p_student_id text,
+  p_check_in_time timestamptz,
+  p_status text,
+  p_face_match_score double precision
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_record attendance_records;
+begin
+  insert into attendance_records (
+    session_id, student_email, student_id, check_in_time, status, face_match_score, created_at
+  )
+  values (
+    p_session_id, p_student_email, p_student_id, p_check_in_time, p_status, p_face_match_score, p_check_in_time
+  )
+  on conflict (session_id, student_email) do nothing
+  returning * into v_record;
+
+  if v_record.id is null then
+    return jsonb_build_object('inserted', false);
+  end if;
+
+  return jsonb_build_object('inserted', true, 'record', to_jsonb(v_record));
+end;
+$$;
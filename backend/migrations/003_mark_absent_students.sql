@@ -0,0 +1,25 @@
+-- 003_mark_absent_students.sql
+-- Absent marking for an ended session as one set-based insert.
+
+create or replace function public.mark_absent_students(p_session_id uuid)
+returns integer
+language plpgsql
+as $$
+declare
+  v_count integer;
+begin
+  insert into attendance_records (session_id, student_email, student_id, check_in_time, status, created_at)
+  select s.id, cs.student_email, u.school_id, now(), 'absent', now()
+  from attendance_sessions s
+  join class_students cs on cs.class_id = s.class_id
+  join users u on u.email = cs.student_email
+  where s.id = p_session_id
+  on conflict (session_id, student_email) do nothing;
+
+  get diagnostics v_count = row_count;
+  return v_count;
+end;
+$$;
+
+create index if not exists class_students_class_idx
+  on class_students (class_id);
@@ -0,0 +1,198 @@
+-- 004_attendance_analytics.sql
+-- Precomputed attendance aggregates, kept up to date by triggers on every
+-- record insert (check-in, write-behind flush, absent marking, import) and
+-- every session end. The analytics endpoints only read these small rows.
+
+create table if not exists session_attendance_stats (
+  session_id uuid primary key references attendance_sessions (id) on delete cascade,
+  class_id text not null,
+  present_count integer not null default 0,
+  late_count integer not null default 0,
+  absent_count integer not null default 0,
+  started_at timestamptz,
+  ended_at timestamptz,
+  updated_at timestamptz not null default now()
+);
+
+create index if not exists session_attendance_stats_class_idx
+  on session_attendance_stats (class_id, started_at desc);
+
+create table if not exists class_attendance_stats (
+  class_id text primary key,
+  sessions_count integer not null default 0,
+  present_count integer not null default 0,
+  late_count integer not null default 0,
+  absent_count integer not null default 0,
+  updated_at timestamptz not null default now()
+);
+
+create table if not exists student_attendance_stats (
+  class_id text not null,
+  student_email text not null,
+  present_count integer not null default 0,
+  late_count integer not null default 0,
+  absent_count integer not null default 0,
+  current_streak integer not null default 0,
+  longest_streak integer not null default 0,
+  last_status text,
+  updated_at timestamptz not null default now(),
+  primary key (class_id, student_email)
+);
+
+create index if not exists student_attendance_stats_email_idx
+  on student_attendance_stats (student_email);
+
+-- One attendance record inserted: bump session, class and student counters
+create or replace function public.attendance_stats_on_record()
+returns trigger
+language plpgsql
+as $$
+declare
+  v_class_id text;
+  v_started_at timestamptz;
+  v_present integer := case when new.status = 'present' then 1 else 0 end;
+  v_late integer := case when new.status = 'late' then 1 else 0 end;
+  v_absent integer := case when new.status = 'absent' then 1 else 0 end;
+begin
+  select s.class_id::text, s.start_time into v_class_id, v_started_at
+  from attendance_sessions s
+  where s.id = new.session_id;
+
+  if v_class_id is null then
+    return new;
+  end if;
+
+  insert into session_attendance_stats as t (session_id, class_id, present_count, late_count, absent_count, started_at)
+  values (new.session_id, v_class_id, v_present, v_late, v_absent, v_started_at)
+  on conflict (session_id) do update set
+    present_count = t.present_count + excluded.present_count,
+    late_count = t.late_count + excluded.late_count,
+    absent_count = t.absent_count + excluded.absent_count,
+    updated_at = now();
+
+  insert into class_attendance_stats as t (class_id, present_count, late_count, absent_count)
+  values (v_class_id, v_present, v_late, v_absent)
+  on conflict (class_id) do update set
+    present_count = t.present_count + excluded.present_count,
+    late_count = t.late_count + excluded.late_count,
+    absent_count = t.absent_count + excluded.absent_count,
+    updated_at = now();
+
+  insert into student_attendance_stats as t (
+    class_id, student_email, present_count, late_count, absent_count,
+    current_streak, longest_streak, last_status
+  )
+  values (
+    v_class_id, new.student_email, v_present, v_late, v_absent,
+    1 - v_absent, 1 - v_absent, new.status
+  )
+  on conflict (class_id, student_email) do update set
+    present_count = t.present_count + excluded.present_count,
+    late_count = t.late_count + excluded.late_count,
+    absent_count = t.absent_count + excluded.absent_count,
+    current_streak = case when excluded.absent_count = 1 then 0 else t.current_streak + 1 end,
+    longest_streak = greatest(
+      t.longest_streak,
+      case when excluded.absent_count = 1 then 0 else t.current_streak + 1 end
+    ),
+    last_status = excluded.last_status,
+    updated_at = now();
+
+  return new;
+end;
+$$;
+
+drop trigger if exists attendance_stats_on_record on attendance_records;
+create trigger attendance_stats_on_record
+  after insert on attendance_records
+  for each row execute function public.attendance_stats_on_record();
+
+-- Session ended: count it for the class and stamp the session row
+create or replace function public.attendance_stats_on_session_end()
+returns trigger
+language plpgsql
+as $$
+begin
+  if new.status = 'ended' and old.status is distinct from 'ended' then
+    insert into class_attendance_stats as t (class_id, sessions_count)
+    values (new.class_id::text, 1)
+    on conflict (class_id) do update set
+      sessions_count = t.sessions_count + 1,
+      updated_at = now();
+
+    insert into session_attendance_stats as t (session_id, class_id, started_at, ended_at)
+    values (new.id, new.class_id::text, new.start_time, now())
+    on conflict (session_id) do update set
+      ended_at = now(),
+      updated_at = now();
+  end if;
+  return new;
+end;
+$$;
+
+drop trigger if exists attendance_stats_on_session_end on attendance_sessions;
+create trigger attendance_stats_on_session_end
+  after update of status on attendance_sessions
+  for each row execute function public.attendance_stats_on_session_end();
+
+-- Backfill from existing data (run once, before new check-ins arrive)
+insert into session_attendance_stats (session_id, class_id, present_count, late_count, absent_count, started_at, ended_at)
+select s.id, s.class_id::text,
+  count(r.*) filter (where r.status = 'present'),
+  count(r.*) filter (where r.status = 'late'),
+  count(r.*) filter (where r.status = 'absent'),
+  s.start_time,
+  case when s.status = 'ended' then coalesce(s.updated_at, s.end_time) end
+from attendance_sessions s
+left join attendance_records r on r.session_id = s.id
+group by s.id
+on conflict (session_id) do nothing;
+
+insert into class_attendance_stats (class_id, sessions_count, present_count, late_count, absent_count)
+select class_id,
+  count(*) filter (where ended_at is not null),
+  sum(present_count), sum(late_count), sum(absent_count)
+from session_attendance_stats
+group by class_id
+on conflict (class_id) do nothing;
+
+with ordered as (
+  select s.class_id::text as class_id, r.student_email, r.status, s.start_time,
+    count(*) filter (where r.status = 'absent') over (
+      partition by s.class_id, r.student_email order by s.start_time
+    ) as absences_so_far
+  from attendance_records r
+  join attendance_sessions s on s.id = r.session_id
+),
+runs as (
+  select class_id, student_email, absences_so_far,
+    count(*) filter (where status <> 'absent') as run_length
+  from ordered
+  group by class_id, student_email, absences_so_far
+),
+totals as (
+  select class_id, student_email,
+    count(*) filter (where status = 'present') as present_count,
+    count(*) filter (where status = 'late') as late_count,
+    count(*) filter (where status = 'absent') as absent_count,
+    max(absences_so_far) as last_run,
+    (array_agg(status order by start_time desc))[1] as last_status
+  from ordered
+  group by class_id, student_email
+)
+insert into student_attendance_stats (
+  class_id, student_email, present_count, late_count, absent_count,
+  current_streak, longest_streak, last_status
+)
+select t.class_id, t.student_email, t.present_count, t.late_count, t.absent_count,
+  coalesce((
+    select r.run_length from runs r
+    where r.class_id = t.class_id and r.student_email = t.student_email and r.absences_so_far = t.last_run
+  ), 0),
+  coalesce((
+    select max(r.run_length) from runs r
+    where r.class_id = t.class_id and r.student_email = t.student_email
+  ), 0),
+  t.last_status
+from totals t
+on conflict (class_id, student_email) do nothing;
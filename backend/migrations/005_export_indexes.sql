@@ -0,0 +1,9 @@
+-- 005_export_indexes.sql
+-- Supports keyset-paginated exports: sessions of a class in a date range,
+-- then their records in (created_at, id) order.
+
+create index if not exists attendance_sessions_class_start_idx
+  on attendance_sessions (class_id, start_time);
+
+create index if not exists attendance_records_session_created_idx
+  on attendance_records (session_id, created_at, id);
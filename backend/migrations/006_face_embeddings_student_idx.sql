@@ -0,0 +1,6 @@
+-- 006_face_embeddings_student_idx.sql
+-- Lets the face gallery page through active embeddings in student_id order.
+
+create index if not exists student_face_embeddings_active_student_idx
+  on student_face_embeddings (student_id)
+  where is_active;
@@ -0,0 +1,6 @@
+-- 007_session_webcam_config.sql
+-- The camera an active session's auto attendance watches, so the backend
+-- can restart the engine after a restart.
+
+alter table attendance_sessions
+  add column if not exists webcam_config jsonb;
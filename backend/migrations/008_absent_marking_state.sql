@@ -0,0 +1,42 @@
+-- 008_absent_marking_state.sql
+-- Records when a session's absentees were marked. An ended session without
+-- absent_marked_at still needs marking (the job failed, or the backend
+-- restarted first); the backend retries those until they succeed.
+
+alter table attendance_sessions
+  add column if not exists absent_marked_at timestamptz;
+
+-- Sessions ended before this migration were already handled
+update attendance_sessions
+set absent_marked_at = coalesce(updated_at, end_time)
+where status = 'ended' and absent_marked_at is null;
+
+create index if not exists attendance_sessions_absent_pending_idx
+  on attendance_sessions (id)
+  where status = 'ended' and absent_marked_at is null;
+
+-- Same set-based insert as 003, plus the marker, in one transaction
+create or replace function public.mark_absent_students(p_session_id uuid)
+returns integer
+language plpgsql
+as $$
+declare
+  v_count integer;
+begin
+  insert into attendance_records (session_id, student_email, student_id, check_in_time, status, created_at)
+  select s.id, cs.student_email, u.school_id, now(), 'absent', now()
+  from attendance_sessions s
+  join class_students cs on cs.class_id = s.class_id
+  join users u on u.email = cs.student_email
+  where s.id = p_session_id
+  on conflict (session_id, student_email) do nothing;
+
+  get diagnostics v_count = row_count;
+
+  update attendance_sessions
+  set absent_marked_at = now()
+  where id = p_session_id;
+
+  return v_count;
+end;
+$$;
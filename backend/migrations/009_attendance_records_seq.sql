@@ -0,0 +1,11 @@
+-- 009_attendance_records_seq.sql
+-- A database-assigned, increasing number per attendance record. The records
+-- endpoint pages on it: created_at comes from the app (check-in time, or a
+-- journal replay), so a record can commit with a created_at older than rows
+-- a poller has already moved past. seq is taken at insert, just before commit.
+
+alter table attendance_records
+  add column if not exists seq bigserial;
+
+create index if not exists attendance_records_session_seq_idx
+  on attendance_records (session_id, seq);
@@ -0,0 +1,76 @@
+-- 010_refresh_student_stats.sql
+-- Recomputes student_attendance_stats from the records themselves. The
+-- insert trigger from 004 assumes records arrive in session order, which
+-- holds for live check-ins but not for historical imports; the importer
+-- calls this for the students and sessions of each chunk it inserted.
+
+create or replace function public.refresh_student_attendance_stats(
+  p_session_ids uuid[],
+  p_student_emails text[]
+)
+returns integer
+language plpgsql
+as $$
+declare
+  v_count integer;
+begin
+  -- Same computation as the 004 backfill, limited to the affected students
+  with affected as (
+    select distinct s.class_id, e.student_email
+    from attendance_sessions s
+    cross join unnest(p_student_emails) as e (student_email)
+    where s.id = any (p_session_ids)
+  ),
+  ordered as (
+    select s.class_id::text as class_id, r.student_email, r.status, s.start_time,
+      count(*) filter (where r.status = 'absent') over (
+        partition by s.class_id, r.student_email order by s.start_time
+      ) as absences_so_far
+    from attendance_records r
+    join attendance_sessions s on s.id = r.session_id
+    join affected a on a.class_id = s.class_id and a.student_email = r.student_email
+  ),
+  runs as (
+    select class_id, student_email, absences_so_far,
+      count(*) filter (where status <> 'absent') as run_length
+    from ordered
+    group by class_id, student_email, absences_so_far
+  ),
+  totals as (
+    select class_id, student_email,
+      count(*) filter (where status = 'present') as present_count,
+      count(*) filter (where status = 'late') as late_count,
+      count(*) filter (where status = 'absent') as absent_count,
+      max(absences_so_far) as last_run,
+      (array_agg(status order by start_time desc))[1] as last_status
+    from ordered
+    group by class_id, student_email
+  )
+  insert into student_attendance_stats as t (
+    class_id, student_email, present_count, late_count, absent_count,
+    current_streak, longest_streak, last_status
+  )
+  select o.class_id, o.student_email, o.present_count, o.late_count, o.absent_count,
+    coalesce((
+      select r.run_length from runs r
+      where r.class_id = o.class_id and r.student_email = o.student_email and r.absences_so_far = o.last_run
+    ), 0),
+    coalesce((
+      select max(r.run_length) from runs r
+      where r.class_id = o.class_id and r.student_email = o.student_email
+    ), 0),
+    o.last_status
+  from totals o
+  on conflict (class_id, student_email) do update set
+    present_count = excluded.present_count,
+    late_count = excluded.late_count,
+    absent_count = excluded.absent_count,
+    current_streak = excluded.current_streak,
+    longest_streak = excluded.longest_streak,
+    last_status = excluded.last_status,
+    updated_at = now();
+
+  get diagnostics v_count = row_count;
+  return v_count;
+end;
+$$;
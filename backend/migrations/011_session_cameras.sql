@@ -0,0 +1,24 @@
+-- 011_session_cameras.sql
+-- Moves the auto attendance camera (including its credentials) off
+-- attendance_sessions, which clients read with the anon key and which
+-- checkin_context returns whole, into a table only the backend can read.
+-- The backend must use the service role key (SUPABASE_KEY) for it.
+
+create table if not exists session_cameras (
+  session_id uuid primary key references attendance_sessions (id) on delete cascade,
+  webcam_config jsonb not null,
+  updated_at timestamptz not null default now()
+);
+
+-- No policies: with row level security on, only the service role gets through
+alter table session_cameras enable row level security;
+revoke all on session_cameras from anon, authenticated;
+
+insert into session_cameras (session_id, webcam_config)
+select id, webcam_config
+from attendance_sessions
+where webcam_config is not null
+on conflict (session_id) do nothing;
+
+alter table attendance_sessions
+  drop column if exists webcam_config;
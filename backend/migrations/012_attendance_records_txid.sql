@@ -0,0 +1,33 @@
+-- 012_attendance_records_txid.sql
+-- seq alone is not a safe cursor: it is taken at insert, but concurrent
+-- transactions commit in any order, so a poller can move past a seq whose
+-- row only becomes visible later. Each record now also stores the id of the
+-- transaction that inserted it, and pages are read in (txid, seq) order up
+-- to the snapshot's xmin: every transaction below it has finished, and any
+-- still running has a txid at or above it, so its rows sort after the
+-- cursor once they commit.
+
+alter table attendance_records
+  add column if not exists txid xid8 not null default pg_current_xact_id();
+
+create index if not exists attendance_records_session_txid_seq_idx
+  on attendance_records (session_id, txid, seq);
+
+create or replace function public.get_session_records_page(
+  p_session_id uuid,
+  p_after_txid bigint,
+  p_after_seq bigint,
+  p_limit integer
+)
+returns setof attendance_records
+language sql
+stable
+as $$
+  select r.*
+  from attendance_records r
+  where r.session_id = p_session_id
+    and (r.txid, r.seq) > (p_after_txid::text::xid8, p_after_seq)
+    and r.txid < pg_snapshot_xmin(pg_current_snapshot())
+  order by r.txid, r.seq
+  limit p_limit;
+$$;
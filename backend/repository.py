@@ -0,0 +1,184 @@
+# repository.py
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+
+class AttendanceRepository(ABC):
+    """Data access used by the API. Implemented by Database (Supabase) and SQLiteDatabase.
+
+    Methods taking a `select` accept a PostgREST-style column list, e.g.
+    "id,created_at,users!attendance_records_student_email_fkey(full_name)";
+    embedded resources come back as nested dicts. Every data method is abstract,
+    so a backend missing one fails when it is created.
+    """
+
+    async def close(self):
+        pass
+
+    def metrics(self) -> Dict:
+        return {}
+
+    @property
+    def degraded(self) -> bool:
+        """True while the store is failing and callers should fall back to local data"""
+        return False
+
+    # Sessions
+    @abstractmethod
+    async def get_active_session(self, session_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    async def class_has_active_session(self, class_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def create_session(self, data: Dict) -> Dict:
+        ...
+
+    @abstractmethod
+    async def end_session(self, session_id: str, updated_at: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    async def end_sessions(self, session_ids: List[str], updated_at: str) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def get_active_sessions(self, select: str = "*") -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def set_session_webcam_config(self, session_id: str, webcam_config: Optional[Dict]):
+        """Remember (or, with None, forget) the camera auto attendance watches for the session.
+        Kept apart from the session row: it holds camera credentials."""
+
+    @abstractmethod
+    async def get_session_webcam_configs(self, session_ids: List[str]) -> Dict[str, Dict]:
+        """Saved cameras of these sessions, by session id"""
+
+    # Check-in
+    @abstractmethod
+    async def checkin_context(self, session_id: str, student_email: str) -> Dict:
+        """{"session", "already_checked_in", "student_id", "face_embedding_json"} in one call"""
+
+    async def record_checkin(
+        self,
+        session_id: str,
+        student_email: str,
+        student_id: str,
+        check_in_time: str,
+        status: str,
+        face_match_score: Optional[float],
+    ) -> Dict:
+        """Insert one record unless the student already has one: {"inserted", "record"}"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def mark_absent_students(self, session_id: str) -> int:
+        """Insert absent records for every enrolled student without one and stamp the
+        session's absent_marked_at, in one transaction; returns the count"""
+
+    @abstractmethod
+    async def get_sessions_pending_absent(self) -> List[Dict]:
+        """Ended sessions whose absentees have not been marked yet, as {"id"}"""
+
+    # Records
+    @abstractmethod
+    async def get_session_records(self, session_id: str, select: str = "*") -> List[Dict]:
+        ...
+
+    async def get_session_records_page(
+        self,
+        session_id: str,
+        select: str,
+        limit: int,
+        after: Optional[Dict] = None,
+    ) -> List[Dict]:
+        """Committed records in (txid, seq) order after the cursor {"txid", "seq"}; a record
+        committing later never sorts before a page already returned. select must include both."""
+        raise NotImplementedError
+
+    async def get_class_records_page(
+        self,
+        class_id: str,
+        select: str,
+        start: str,
+        end: str,
+        limit: int,
+        after: Optional[Dict] = None,
+    ) -> List[Dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_checked_in_emails(self, session_id: str) -> List[str]:
+        ...
+
+    @abstractmethod
+    async def insert_records(self, records: List[Dict]) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def set_record_image_url(self, session_id: str, student_email: str, url: str) -> bool:
+        """False if the record does not exist (yet)"""
+
+    @abstractmethod
+    async def upsert_rows(self, table: str, rows: List[Dict], on_conflict: List[str]):
+        """Insert rows in one statement, updating rows whose on_conflict key already exists"""
+
+    # Users
+    @abstractmethod
+    async def get_school_id(self, email: str) -> Optional[str]:
+        ...
+
+    # Class students
+    @abstractmethod
+    async def get_class_roster(self, class_id: str) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def count_class_students(self, class_id: str) -> int:
+        ...
+
+    # Embeddings
+    @abstractmethod
+    async def get_face_embedding(self, student_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def get_face_embeddings(self, student_ids: List[str]) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def get_face_embeddings_page(self, limit: int, after_student_id: Optional[str] = None) -> List[Dict]:
+        """Active embeddings of all students, in student_id order, after the given id"""
+
+    @abstractmethod
+    async def save_face_embedding(self, student_id: str, data: Dict) -> Dict:
+        ...
+
+    # Analytics
+    @abstractmethod
+    async def get_class_stats(self, class_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    async def get_class_session_stats(self, class_id: str, limit: int) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def get_class_student_stats(self, class_id: str) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def get_session_stats(self, session_ids: List[str]) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def get_student_stats(self, student_email: str) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    async def refresh_student_stats(self, session_ids: List[str], student_emails: List[str]) -> int:
+        """Recompute the students' stats rows in the sessions' classes from their records,
+        streaks in session start order; returns the rows written"""
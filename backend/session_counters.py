@@ -0,0 +1,47 @@
+# session_counters.py
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class SessionCounters:
+    """Present/late/absent counts per session, kept in memory for cheap dashboard refreshes"""
+
+    def __init__(self, max_sessions: int = 1000):
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def init(self, session_id: str, roster_size: Optional[int], present: int = 0, late: int = 0, absent: int = 0):
+        self.sessions[session_id] = {
+            "roster_size": roster_size,
+            "present": present,
+            "late": late,
+            "absent": absent,
+            "ended": False
+        }
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+
+    def set_roster_size(self, session_id: str, roster_size: int):
+        if session_id in self.sessions:
+            self.sessions[session_id]["roster_size"] = roster_size
+
+    def record(self, session_id: str, status: str):
+        counters = self.sessions.get(session_id)
+        if counters is not None and status in ("present", "late", "absent"):
+            counters[status] += 1
+
+    def end(self, session_id: str, absent_count: Optional[int]):
+        counters = self.sessions.get(session_id)
+        if counters is not None:
+            counters["absent"] += absent_count or 0
+            counters["ended"] = True
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        counters = self.sessions.get(session_id)
+        if counters is None:
+            return None
+
+        remaining = None
+        if counters["roster_size"] is not None:
+            remaining = max(0, counters["roster_size"] - counters["present"] - counters["late"] - counters["absent"])
+        return {**counters, "remaining": remaining}
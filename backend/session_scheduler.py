@@ -0,0 +1,145 @@
+# session_scheduler.py
+import time
+import heapq
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SessionExpiryScheduler:
+    """Ends attendance sessions once their end_time has passed.
+
+    Upcoming end times live in a min-heap; cancelled or rescheduled entries are
+    skipped lazily when they reach the top. The schedule is rebuilt from the
+    database's active sessions on start, so it survives restarts; if the
+    database is unreachable then, loading is retried in the background.
+    It is re-synced every resync_interval, picking up sessions created or
+    extended outside the backend (the app inserts sessions directly).
+    """
+
+    def __init__(
+        self,
+        load_active_sessions: Callable[[], Awaitable[List[Dict]]],
+        end_sessions: Callable[[List[str]], Awaitable[None]],
+        max_sleep: float = 60,
+        retry_interval: float = 30,
+        resync_interval: float = 60,
+    ):
+        self.load_active_sessions = load_active_sessions
+        self.end_sessions = end_sessions
+        self.max_sleep = max_sleep
+        self.retry_interval = retry_interval
+        self.resync_interval = resync_interval
+
+        self._heap: List[Tuple[float, str]] = []
+        self._scheduled: Dict[str, float] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._synced_at = 0.0
+        self.loaded = False
+        self.expired = 0
+        self.syncs = 0
+
+    def schedule(self, session_id: str, end_time: str):
+        """Schedule (or reschedule) a session; end_time is an ISO timestamp"""
+        deadline = datetime.fromisoformat(end_time).timestamp()
+        self._scheduled[session_id] = deadline
+        heapq.heappush(self._heap, (deadline, session_id))
+        if self._wakeup is not None and self._heap[0][1] == session_id:
+            self._wakeup.set()
+
+    def cancel(self, session_id: str):
+        self._scheduled.pop(session_id, None)
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def _load(self):
+        """Schedule every active session, retrying until the database answers"""
+        while True:
+            try:
+                await self._sync()
+                break
+            except Exception as e:
+                logger.error(f"Failed to load active sessions, retrying in {self.retry_interval}s: {e}")
+                await asyncio.sleep(self.retry_interval)
+
+        self.loaded = True
+        logger.info(f"Session expiry scheduler tracking {len(self._scheduled)} active sessions")
+
+    async def _sync(self):
+        """Schedule active sessions that are missing from the schedule or whose end_time changed"""
+        sessions = await self.load_active_sessions()
+        for session in sessions:
+            deadline = datetime.fromisoformat(session["end_time"]).timestamp()
+            if self._scheduled.get(session["id"]) != deadline:
+                self.schedule(session["id"], session["end_time"])
+        self._synced_at = time.monotonic()
+        self.syncs += 1
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _pop_due(self, now: float) -> List[str]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, session_id = heapq.heappop(self._heap)
+            # Skip entries that were cancelled or rescheduled
+            if self._scheduled.get(session_id) == deadline:
+                del self._scheduled[session_id]
+                due.append(session_id)
+        return due
+
+    async def _run(self):
+        await self._load()
+        while True:
+            if time.monotonic() - self._synced_at >= self.resync_interval:
+                try:
+                    await self._sync()
+                except Exception as e:
+                    # Known sessions still expire; the next resync tries again
+                    self._synced_at = time.monotonic()
+                    logger.error(f"Failed to re-sync active sessions: {e}")
+
+            due = self._pop_due(datetime.now().timestamp())
+            if due:
+                try:
+                    await self.end_sessions(due)
+                    self.expired += len(due)
+                    logger.info(f"Ended {len(due)} expired sessions")
+                except Exception as e:
+                    logger.error(f"Failed to end expired sessions, retrying later: {e}")
+                    retry_at = datetime.now().timestamp() + self.retry_interval
+                    for session_id in due:
+                        self._scheduled[session_id] = retry_at
+                        heapq.heappush(self._heap, (retry_at, session_id))
+
+            sleep_for = min(self.max_sleep, max(0.0, self._synced_at + self.resync_interval - time.monotonic()))
+            if self._heap:
+                sleep_for = min(sleep_for, max(0.0, self._heap[0][0] - datetime.now().timestamp()))
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=sleep_for)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict:
+        next_deadline = min(self._scheduled.values()) if self._scheduled else None
+        return {
+            "loaded": self.loaded,
+            "scheduled": len(self._scheduled),
+            "expired": self.expired,
+            "syncs": self.syncs,
+            "next_end_time": datetime.fromtimestamp(next_deadline).isoformat() if next_deadline else None,
+        }
@@ -0,0 +1,238 @@
+# snapshots.py
+import os
+import re
+import time
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore(ABC):
+    """Where check-in snapshots go. put() returns the URL stored on the record."""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str) -> str:
+        ...
+
+    @abstractmethod
+    def prune(self, max_age_seconds: float, max_bytes: int) -> int:
+        """Apply retention; returns the number of blobs deleted"""
+
+
+class LocalBlobStore(BlobStore):
+    """Files under root, served by the API under base_url"""
+
+    def __init__(self, root: str, base_url: str):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(root, exist_ok=True)
+
+    def put(self, key: str, data: bytes, content_type: str) -> str:
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a half-written file is never served
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        return f"{self.base_url}/{key}"
+
+    def prune(self, max_age_seconds: float, max_bytes: int) -> int:
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+
+        cutoff = time.time() - max_age_seconds
+        total = sum(size for _, size, _ in files)
+        deleted = 0
+        for mtime, size, path in files:
+            # Oldest first: expired files, then whatever keeps us over the size cap
+            if mtime >= cutoff and total <= max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            deleted += 1
+
+        for directory, subdirectories, names in os.walk(self.root, topdown=False):
+            if directory != self.root and not subdirectories and not names:
+                os.rmdir(directory)
+        return deleted
+
+
+def safe_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", name)
+
+
+def snapshot_key(session_id: str, name: str, taken_at: datetime) -> str:
+    return f"{session_id}/{safe_name(name)}-{taken_at.strftime('%Y%m%dT%H%M%S%f')}.jpg"
+
+
+def thumbnail_key(key: str, student_email: str) -> str:
+    """A student's face thumbnail sits next to the snapshot it was cropped from"""
+    return f"{key[:-len('.jpg')]}.{safe_name(student_email)}.thumb.jpg"
+
+
+def face_thumbnail(image: np.ndarray, face_location: Tuple[int, int, int, int], size: int, quality: int) -> bytes:
+    """Square JPEG crop around an already-detected face box (top, right, bottom, left)"""
+    top, right, bottom, left = face_location
+    margin = int((bottom - top) * 0.25)
+    height, width = image.shape[:2]
+    crop = image[max(0, top - margin):min(height, bottom + margin), max(0, left - margin):min(width, right + margin)]
+    crop = cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Failed to encode thumbnail")
+    return encoded.tobytes()
+
+
+class Snapshot:
+    def __init__(self, session_id: str, image_bytes: bytes, faces: List[Tuple[str, Tuple[int, int, int, int]]]):
+        self.session_id = session_id
+        self.image_bytes = image_bytes
+        # (student_email, face_location) for every record that uses this image
+        self.faces = faces
+        self.taken_at = datetime.now()
+        self.attempts = 0
+
+
+class SnapshotWriter:
+    """Stores check-in images and face thumbnails off the request path.
+
+    submit() never blocks: snapshots queue for a few workers, and a full
+    queue drops the snapshot rather than slowing check-ins. Once stored, the
+    record's webcam_image_url is set to the snapshot (a group photo is stored
+    once for all its records); see thumbnail_key for the face crops. Records
+    still in the write-behind journal are retried until they reach the database.
+    """
+
+    def __init__(
+        self,
+        store: BlobStore,
+        update_url: Callable[[str, str, str], Awaitable[bool]],
+        queue_size: int = 200,
+        workers: int = 2,
+        thumbnail_size: int = 96,
+        thumbnail_quality: int = 80,
+        retention_seconds: float = 30 * 86400,
+        max_bytes: int = 2 * 1024 ** 3,
+        prune_interval: float = 3600,
+        update_retries: int = 5,
+        update_retry_interval: float = 2.0,
+    ):
+        self.store = store
+        self.update_url = update_url
+        self.queue_size = queue_size
+        self.workers = workers
+        self.thumbnail_size = thumbnail_size
+        self.thumbnail_quality = thumbnail_quality
+        self.retention_seconds = retention_seconds
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self.update_retries = update_retries
+        self.update_retry_interval = update_retry_interval
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+        self.stored = 0
+        self.dropped = 0
+        self.failures = 0
+        self.pruned = 0
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._prune()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def submit(self, session_id: str, image_bytes: bytes, faces: List[Tuple[str, Tuple[int, int, int, int]]]):
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait(Snapshot(session_id, image_bytes, faces))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def _write(self, snapshot: Snapshot) -> Dict[str, str]:
+        """Store the image once and one thumbnail per face; returns email -> image URL"""
+        image = cv2.imdecode(np.frombuffer(snapshot.image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Failed to decode snapshot")
+
+        name = snapshot.faces[0][0] if len(snapshot.faces) == 1 else "group"
+        key = snapshot_key(snapshot.session_id, name, snapshot.taken_at)
+        url = self.store.put(key, snapshot.image_bytes, "image/jpeg")
+
+        urls = {}
+        for student_email, face_location in snapshot.faces:
+            thumbnail = face_thumbnail(image, face_location, self.thumbnail_size, self.thumbnail_quality)
+            self.store.put(thumbnail_key(key, student_email), thumbnail, "image/jpeg")
+            urls[student_email] = url
+        return urls
+
+    async def _work(self):
+        while True:
+            snapshot = await self._queue.get()
+            try:
+                urls = await asyncio.to_thread(self._write, snapshot)
+                await self._update(snapshot, urls)
+                self.stored += 1
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                logger.error(f"Error storing snapshot for session {snapshot.session_id}: {e}")
+
+    async def _update(self, snapshot: Snapshot, urls: Dict[str, str]):
+        pending = dict(urls)
+        while pending:
+            for student_email, url in list(pending.items()):
+                if await self.update_url(snapshot.session_id, student_email, url):
+                    del pending[student_email]
+            snapshot.attempts += 1
+            if not pending or snapshot.attempts > self.update_retries:
+                break
+            # Not in the database yet (still journaled): try again shortly
+            await asyncio.sleep(self.update_retry_interval * snapshot.attempts)
+        if pending:
+            raise RuntimeError(f"No record to attach the snapshot to for {', '.join(pending)}")
+
+    async def _prune(self):
+        while True:
+            try:
+                deleted = await asyncio.to_thread(self.store.prune, self.retention_seconds, self.max_bytes)
+                self.pruned += deleted
+                if deleted:
+                    logger.info(f"Snapshot retention removed {deleted} files")
+            except Exception as e:
+                logger.error(f"Snapshot retention failed: {e}")
+            await asyncio.sleep(self.prune_interval)
+
+    def stats(self) -> Dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "stored": self.stored,
+            "dropped": self.dropped,
+            "failures": self.failures,
+            "pruned": self.pruned,
+            "last_error": self.last_error,
+        }
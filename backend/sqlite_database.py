@@ -0,0 +1,749 @@
+# sqlite_database.py
+import json
+import time
+import uuid
+import asyncio
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import DatabaseError, QueryMetrics
+from repository import AttendanceRepository
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS users (
+    email TEXT PRIMARY KEY,
+    school_id TEXT UNIQUE,
+    full_name TEXT,
+    role TEXT,
+    created_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS class_students (
+    class_id TEXT NOT NULL,
+    student_email TEXT NOT NULL REFERENCES users (email),
+    created_at TEXT,
+    PRIMARY KEY (class_id, student_email)
+);
+
+CREATE TABLE IF NOT EXISTS attendance_sessions (
+    id TEXT PRIMARY KEY,
+    class_id TEXT NOT NULL,
+    teacher_email TEXT,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    on_time_limit_minutes INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    absent_marked_at TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS attendance_sessions_status_idx
+    ON attendance_sessions (status, class_id);
+CREATE INDEX IF NOT EXISTS attendance_sessions_class_start_idx
+    ON attendance_sessions (class_id, start_time);
+
+-- Camera (with credentials) per session, apart from the session row; see migrations/011
+CREATE TABLE IF NOT EXISTS session_cameras (
+    session_id TEXT PRIMARY KEY REFERENCES attendance_sessions (id) ON DELETE CASCADE,
+    webcam_config TEXT NOT NULL,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS attendance_records (
+    id TEXT PRIMARY KEY DEFAULT (lower(hex(randomblob(16)))),
+    session_id TEXT NOT NULL REFERENCES attendance_sessions (id) ON DELETE CASCADE,
+    student_email TEXT NOT NULL,
+    student_id TEXT,
+    check_in_time TEXT,
+    status TEXT NOT NULL,
+    face_match_score REAL,
+    webcam_image_url TEXT,
+    created_at TEXT NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS attendance_records_session_student_key
+    ON attendance_records (session_id, student_email);
+CREATE INDEX IF NOT EXISTS attendance_records_session_created_idx
+    ON attendance_records (session_id, created_at, id);
+
+CREATE TABLE IF NOT EXISTS student_face_embeddings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id TEXT NOT NULL,
+    face_embedding_json TEXT NOT NULL,
+    face_quality REAL,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS student_face_embeddings_student_key
+    ON student_face_embeddings (student_id);
+
+CREATE TABLE IF NOT EXISTS session_attendance_stats (
+    session_id TEXT PRIMARY KEY,
+    class_id TEXT NOT NULL,
+    present_count INTEGER NOT NULL DEFAULT 0,
+    late_count INTEGER NOT NULL DEFAULT 0,
+    absent_count INTEGER NOT NULL DEFAULT 0,
+    started_at TEXT,
+    ended_at TEXT,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS session_attendance_stats_class_idx
+    ON session_attendance_stats (class_id, started_at DESC);
+
+CREATE TABLE IF NOT EXISTS class_attendance_stats (
+    class_id TEXT PRIMARY KEY,
+    sessions_count INTEGER NOT NULL DEFAULT 0,
+    present_count INTEGER NOT NULL DEFAULT 0,
+    late_count INTEGER NOT NULL DEFAULT 0,
+    absent_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS student_attendance_stats (
+    class_id TEXT NOT NULL,
+    student_email TEXT NOT NULL,
+    present_count INTEGER NOT NULL DEFAULT 0,
+    late_count INTEGER NOT NULL DEFAULT 0,
+    absent_count INTEGER NOT NULL DEFAULT 0,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    longest_streak INTEGER NOT NULL DEFAULT 0,
+    last_status TEXT,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (class_id, student_email)
+);
+
+CREATE INDEX IF NOT EXISTS student_attendance_stats_email_idx
+    ON student_attendance_stats (student_email);
+
+-- Same aggregates as migrations/004_attendance_analytics.sql
+CREATE TRIGGER IF NOT EXISTS attendance_stats_on_record
+AFTER INSERT ON attendance_records
+WHEN EXISTS (SELECT 1 FROM attendance_sessions WHERE id = NEW.session_id)
+BEGIN
+    INSERT INTO session_attendance_stats (session_id, class_id, present_count, late_count, absent_count, started_at)
+    SELECT s.id, s.class_id, NEW.status = 'present', NEW.status = 'late', NEW.status = 'absent', s.start_time
+    FROM attendance_sessions s WHERE s.id = NEW.session_id
+    ON CONFLICT (session_id) DO UPDATE SET
+        present_count = present_count + excluded.present_count,
+        late_count = late_count + excluded.late_count,
+        absent_count = absent_count + excluded.absent_count,
+        updated_at = CURRENT_TIMESTAMP;
+
+    INSERT INTO class_attendance_stats (class_id, present_count, late_count, absent_count)
+    SELECT s.class_id, NEW.status = 'present', NEW.status = 'late', NEW.status = 'absent'
+    FROM attendance_sessions s WHERE s.id = NEW.session_id
+    ON CONFLICT (class_id) DO UPDATE SET
+        present_count = present_count + excluded.present_count,
+        late_count = late_count + excluded.late_count,
+        absent_count = absent_count + excluded.absent_count,
+        updated_at = CURRENT_TIMESTAMP;
+
+    INSERT INTO student_attendance_stats (
+        class_id, student_email, present_count, late_count, absent_count,
+        current_streak, longest_streak, last_status
+    )
+    SELECT s.class_id, NEW.student_email, NEW.status = 'present', NEW.status = 'late', NEW.status = 'absent',
+        NEW.status != 'absent', NEW.status != 'absent', NEW.status
+    FROM attendance_sessions s WHERE s.id = NEW.session_id
+    ON CONFLICT (class_id, student_email) DO UPDATE SET
+        present_count = present_count + excluded.present_count,
+        late_count = late_count + excluded.late_count,
+        absent_count = absent_count + excluded.absent_count,
+        current_streak = CASE WHEN excluded.absent_count = 1 THEN 0 ELSE current_streak + 1 END,
+        longest_streak = max(
+            longest_streak,
+            CASE WHEN excluded.absent_count = 1 THEN 0 ELSE current_streak + 1 END
+        ),
+        last_status = excluded.last_status,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS attendance_stats_on_session_end
+AFTER UPDATE OF status ON attendance_sessions
+WHEN NEW.status = 'ended' AND OLD.status IS NOT 'ended'
+BEGIN
+    INSERT INTO class_attendance_stats (class_id, sessions_count)
+    VALUES (NEW.class_id, 1)
+    ON CONFLICT (class_id) DO UPDATE SET
+        sessions_count = sessions_count + 1,
+        updated_at = CURRENT_TIMESTAMP;
+
+    INSERT INTO session_attendance_stats (session_id, class_id, started_at, ended_at)
+    VALUES (NEW.id, NEW.class_id, NEW.start_time, CURRENT_TIMESTAMP)
+    ON CONFLICT (session_id) DO UPDATE SET
+        ended_at = CURRENT_TIMESTAMP,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+'''
+
+# Columns added after a table was first released: CREATE TABLE IF NOT EXISTS
+# leaves existing files alone, so these are added with ALTER TABLE when missing,
+# followed by their backfill statement (if any)
+ADDED_COLUMNS = [
+    (
+        "attendance_sessions", "absent_marked_at", "TEXT",
+        "UPDATE attendance_sessions SET absent_marked_at = coalesce(updated_at, end_time) WHERE status = 'ended'",
+    ),
+]
+
+# Stored as JSON text, returned as dicts (jsonb in Postgres)
+JSON_COLUMNS = {"webcam_config"}
+
+# Embedded resources the API asks for, and how to resolve them
+EMBEDS = {
+    "users": ("users", "email", "student_email"),
+    "attendance_sessions": ("attendance_sessions", "id", "session_id"),
+}
+
+
+def parse_select(select: str) -> Tuple[Optional[List[str]], Dict[str, List[str]]]:
+    """Split a PostgREST select into plain columns (None for *) and embeds.
+
+    "id,users!fkey(full_name)" -> (["id"], {"users": ["full_name"]})
+    """
+    tokens, depth, current = [], 0, ""
+    for char in select:
+        if char == "," and depth == 0:
+            tokens.append(current)
+            current = ""
+            continue
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        current += char
+    tokens.append(current)
+
+    columns: Optional[List[str]] = []
+    embeds: Dict[str, List[str]] = {}
+    for token in (token.strip() for token in tokens):
+        if not token:
+            continue
+        if "(" in token:
+            name = token[:token.index("(")].split("!")[0]
+            embeds[name] = [column.strip() for column in token[token.index("(") + 1:-1].split(",")]
+        elif token == "*":
+            columns = None
+        elif columns is not None:
+            columns.append(token)
+    return columns, embeds
+
+
+def placeholders(values: List) -> str:
+    return ",".join("?" * len(values))
+
+
+class SQLiteDatabase(AttendanceRepository):
+    """Local SQLite storage with the same interface as the Supabase Database.
+
+    Meant for on-premise classroom servers and load tests. One connection in
+    WAL mode; queries run in a worker thread, serialized by a lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, QueryMetrics] = {}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(SCHEMA)
+            for table, column, definition, backfill in ADDED_COLUMNS:
+                if column not in {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                    if backfill:
+                        conn.execute(backfill)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    async def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def metrics(self) -> Dict:
+        return {name: metrics.to_dict() for name, metrics in sorted(self._metrics.items())}
+
+    async def _run(self, name: str, work) -> Any:
+        """Run work(conn) in one transaction on a worker thread"""
+        metrics = self._metrics.setdefault(name, QueryMetrics())
+
+        def run():
+            with self._lock:
+                started = time.perf_counter()
+                try:
+                    with self.conn:
+                        return work(self.conn)
+                finally:
+                    metrics.observe((time.perf_counter() - started) * 1000)
+
+        try:
+            return await asyncio.to_thread(run)
+        except sqlite3.Error as e:
+            metrics.errors += 1
+            # Constraint and bad-value errors are the query's fault (as PostgREST's 409/400), not an outage
+            if isinstance(e, sqlite3.IntegrityError):
+                raise DatabaseError(f"{name} failed: {e}", 409)
+            if isinstance(e, (sqlite3.DataError, sqlite3.ProgrammingError, sqlite3.InterfaceError)):
+                raise DatabaseError(f"{name} failed: {e}", 400)
+            raise DatabaseError(f"{name} failed: {e}")
+
+    @staticmethod
+    def _rows(cursor: sqlite3.Cursor) -> List[Dict]:
+        rows = [dict(row) for row in cursor.fetchall()]
+        for row in rows:
+            for column in JSON_COLUMNS & row.keys():
+                if row[column] is not None:
+                    row[column] = json.loads(row[column])
+        return rows
+
+    @staticmethod
+    def _values(row: Dict) -> List:
+        """Row values ready to bind, with JSON columns serialized"""
+        return [
+            json.dumps(value) if column in JSON_COLUMNS and value is not None else value
+            for column, value in row.items()
+        ]
+
+    def _shape(self, conn: sqlite3.Connection, rows: List[Dict], select: str) -> List[Dict]:
+        """Apply a PostgREST-style select to plain rows: project columns, attach embeds"""
+        columns, embeds = parse_select(select)
+
+        for name, embed_columns in embeds.items():
+            table, key, foreign_key = EMBEDS[name]
+            keys = list({row[foreign_key] for row in rows})
+            related = {}
+            if keys:
+                cursor = conn.execute(
+                    f"SELECT * FROM {table} WHERE {key} IN ({placeholders(keys)})", keys
+                )
+                related = {row[key]: row for row in self._rows(cursor)}
+            for row in rows:
+                match = related.get(row[foreign_key])
+                row[name] = {column: match[column] for column in embed_columns} if match else None
+
+        if columns is None:
+            return rows
+        keep = set(columns) | set(embeds)
+        return [{key: value for key, value in row.items() if key in keep} for row in rows]
+
+    # Sessions
+    async def get_active_session(self, session_id: str) -> Optional[Dict]:
+        def work(conn):
+            return self._rows(conn.execute(
+                "SELECT * FROM attendance_sessions WHERE id = ? AND status = 'active'", (session_id,)
+            ))
+        rows = await self._run("sessions.get_active", work)
+        return rows[0] if rows else None
+
+    async def class_has_active_session(self, class_id: str) -> bool:
+        def work(conn):
+            return conn.execute(
+                "SELECT 1 FROM attendance_sessions WHERE status = 'active' AND class_id = ? LIMIT 1", (class_id,)
+            ).fetchone() is not None
+        return await self._run("sessions.class_active", work)
+
+    async def create_session(self, data: Dict) -> Dict:
+        row = {"id": str(uuid.uuid4()), **data}
+
+        def work(conn):
+            conn.execute(
+                f"INSERT INTO attendance_sessions ({','.join(row)}) VALUES ({placeholders(list(row))})",
+                self._values(row),
+            )
+            return self._rows(conn.execute("SELECT * FROM attendance_sessions WHERE id = ?", (row["id"],)))[0]
+        return await self._run("sessions.create", work)
+
+    async def end_session(self, session_id: str, updated_at: str) -> Optional[Dict]:
+        def work(conn):
+            return self._rows(conn.execute(
+                "UPDATE attendance_sessions SET status = 'ended', updated_at = ? WHERE id = ? RETURNING *",
+                (updated_at, session_id),
+            ))
+        rows = await self._run("sessions.end", work)
+        return rows[0] if rows else None
+
+    async def end_sessions(self, session_ids: List[str], updated_at: str) -> List[Dict]:
+        if not session_ids:
+            return []
+
+        def work(conn):
+            return self._rows(conn.execute(
+                f"UPDATE attendance_sessions SET status = 'ended', updated_at = ? "
+                f"WHERE status = 'active' AND id IN ({placeholders(session_ids)}) RETURNING *",
+                [updated_at, *session_ids],
+            ))
+        return await self._run("sessions.end_many", work)
+
+    async def get_active_sessions(self, select: str = "*") -> List[Dict]:
+        def work(conn):
+            rows = self._rows(conn.execute("SELECT * FROM attendance_sessions WHERE status = 'active'"))
+            return self._shape(conn, rows, select)
+        return await self._run("sessions.active", work)
+
+    async def set_session_webcam_config(self, session_id: str, webcam_config: Optional[Dict]):
+        def work(conn):
+            if webcam_config is None:
+                conn.execute("DELETE FROM session_cameras WHERE session_id = ?", (session_id,))
+                return
+            conn.execute(
+                "INSERT INTO session_cameras (session_id, webcam_config, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET "
+                "webcam_config = excluded.webcam_config, updated_at = excluded.updated_at",
+                (session_id, json.dumps(webcam_config), datetime.now().isoformat()),
+            )
+        await self._run("session_cameras.set", work)
+
+    async def get_session_webcam_configs(self, session_ids: List[str]) -> Dict[str, Dict]:
+        if not session_ids:
+            return {}
+
+        def work(conn):
+            rows = self._rows(conn.execute(
+                f"SELECT session_id, webcam_config FROM session_cameras "
+                f"WHERE session_id IN ({placeholders(session_ids)})",
+                session_ids,
+            ))
+            return {row["session_id"]: row["webcam_config"] for row in rows}
+        return await self._run("session_cameras.get", work)
+
+    # Check-in
+    async def checkin_context(self, session_id: str, student_email: str) -> Dict:
+        def work(conn):
+            session = self._rows(conn.execute(
+                "SELECT * FROM attendance_sessions WHERE id = ? AND status = 'active'", (session_id,)
+            ))
+            already_checked_in = conn.execute(
+                "SELECT 1 FROM attendance_records WHERE session_id = ? AND student_email = ?",
+                (session_id, student_email),
+            ).fetchone() is not None
+            user = conn.execute(
+                "SELECT u.school_id, e.face_embedding_json FROM users u "
+                "LEFT JOIN student_face_embeddings e ON e.student_id = u.school_id AND e.is_active "
+                "WHERE u.email = ? LIMIT 1",
+                (student_email,),
+            ).fetchone()
+            return {
+                "session": session[0] if session else None,
+                "already_checked_in": already_checked_in,
+                "student_id": user["school_id"] if user else None,
+                "face_embedding_json": user["face_embedding_json"] if user else None,
+            }
+        return await self._run("checkin.context", work)
+
+    async def record_checkin(
+        self,
+        session_id: str,
+        student_email: str,
+        student_id: str,
+        check_in_time: str,
+        status: str,
+        face_match_score: Optional[float],
+    ) -> Dict:
+        def work(conn):
+            rows = self._rows(conn.execute(
+                "INSERT INTO attendance_records "
+                "(id, session_id, student_email, student_id, check_in_time, status, face_match_score, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (session_id, student_email) DO NOTHING RETURNING *",
+                (str(uuid.uuid4()), session_id, student_email, student_id,
+                 check_in_time, status, face_match_score, check_in_time),
+            ))
+            if not rows:
+                return {"inserted": False}
+            return {"inserted": True, "record": rows[0]}
+        return await self._run("checkin.record", work)
+
+    async def mark_absent_students(self, session_id: str) -> int:
+        now = datetime.now().isoformat()
+
+        def work(conn):
+            students = conn.execute(
+                "SELECT cs.student_email, u.school_id FROM attendance_sessions s "
+                "JOIN class_students cs ON cs.class_id = s.class_id "
+                "JOIN users u ON u.email = cs.student_email "
+                "WHERE s.id = ?",
+                (session_id,),
+            ).fetchall()
+            cursor = conn.executemany(
+                "INSERT INTO attendance_records "
+                "(id, session_id, student_email, student_id, check_in_time, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, 'absent', ?) "
+                "ON CONFLICT (session_id, student_email) DO NOTHING",
+                [(str(uuid.uuid4()), session_id, email, school_id, now, now) for email, school_id in students],
+            )
+            conn.execute("UPDATE attendance_sessions SET absent_marked_at = ? WHERE id = ?", (now, session_id))
+            return cursor.rowcount
+        return await self._run("checkin.mark_absent", work)
+
+    async def get_sessions_pending_absent(self) -> List[Dict]:
+        def work(conn):
+            return self._rows(conn.execute(
+                "SELECT id FROM attendance_sessions WHERE status = 'ended' AND absent_marked_at IS NULL LIMIT 100"
+            ))
+        return await self._run("sessions.pending_absent", work)
+
+    # Records
+    async def get_session_records(self, session_id: str, select: str = "*") -> List[Dict]:
+        def work(conn):
+            rows = self._rows(conn.execute(
+                "SELECT * FROM attendance_records WHERE session_id = ? ORDER BY check_in_time", (session_id,)
+            ))
+            return self._shape(conn, rows, select)
+        return await self._run("records.by_session", work)
+
+    async def get_session_records_page(
+        self,
+        session_id: str,
+        select: str,
+        limit: int,
+        after: Optional[Dict] = None,
+    ) -> List[Dict]:
+        # rowid is seq: assigned at insert, and the single writer commits in that
+        # order, so every record shares txid 0
+        def work(conn):
+            rows = self._rows(conn.execute(
+                "SELECT rowid AS seq, 0 AS txid, * FROM attendance_records WHERE session_id = ? AND rowid > ? "
+                "ORDER BY rowid LIMIT ?",
+                (session_id, after["seq"] if after else 0, limit),
+            ))
+            return self._shape(conn, rows, select)
+        return await self._run("records.page", work)
+
+    async def get_class_records_page(
+        self,
+        class_id: str,
+        select: str,
+        start: str,
+        end: str,
+        limit: int,
+        after: Optional[Dict] = None,
+    ) -> List[Dict]:
+        def work(conn):
+            query = (
+                "SELECT r.* FROM attendance_records r "
+                "JOIN attendance_sessions s ON s.id = r.session_id "
+                "WHERE s.class_id = ? AND s.start_time >= ? AND s.start_time < ?"
+            )
+            params: List[Any] = [class_id, start, end]
+            if after:
+                query += " AND (r.created_at, r.id) > (?, ?)"
+                params += [after["created_at"], after["id"]]
+            query += " ORDER BY r.created_at, r.id LIMIT ?"
+            rows = self._rows(conn.execute(query, [*params, limit]))
+            return self._shape(conn, rows, f"{select},attendance_sessions(start_time)")
+        return await self._run("records.class_page", work)
+
+    async def get_checked_in_emails(self, session_id: str) -> List[str]:
+        def work(conn):
+            return [row[0] for row in conn.execute(
+                "SELECT student_email FROM attendance_records WHERE session_id = ?", (session_id,)
+            )]
+        return await self._run("records.emails", work)
+
+    async def insert_records(self, records: List[Dict]) -> List[Dict]:
+        """Insert records, skipping any (session_id, student_email) that already exists"""
+        def work(conn):
+            inserted = []
+            for record in records:
+                row = {"id": str(uuid.uuid4()), **record}
+                inserted += self._rows(conn.execute(
+                    f"INSERT INTO attendance_records ({','.join(row)}) VALUES ({placeholders(list(row))}) "
+                    f"ON CONFLICT (session_id, student_email) DO NOTHING RETURNING *",
+                    list(row.values()),
+                ))
+            return inserted
+        return await self._run("records.insert", work)
+
+    async def set_record_image_url(self, session_id: str, student_email: str, url: str) -> bool:
+        def work(conn):
+            return conn.execute(
+                "UPDATE attendance_records SET webcam_image_url = ? WHERE session_id = ? AND student_email = ?",
+                (url, session_id, student_email),
+            ).rowcount > 0
+        return await self._run("records.image_url", work)
+
+    async def upsert_rows(self, table: str, rows: List[Dict], on_conflict: List[str]):
+        if not rows:
+            return
+        columns = list(rows[0])
+        updates = ",".join(f"{column} = excluded.{column}" for column in columns if column not in on_conflict)
+        action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+
+        def work(conn):
+            conn.executemany(
+                f"INSERT INTO {table} ({','.join(columns)}) VALUES ({placeholders(columns)}) "
+                f"ON CONFLICT ({','.join(on_conflict)}) {action}",
+                [[row.get(column) for column in columns] for row in rows],
+            )
+        await self._run(f"{table}.upsert", work)
+
+    # Users
+    async def get_school_id(self, email: str) -> Optional[str]:
+        def work(conn):
+            row = conn.execute("SELECT school_id FROM users WHERE email = ?", (email,)).fetchone()
+            return row[0] if row else None
+        return await self._run("users.school_id", work)
+
+    # Class students
+    async def get_class_roster(self, class_id: str) -> List[Dict]:
+        """Roster rows as {"student_email", "users": {"school_id"}}"""
+        def work(conn):
+            return [
+                {"student_email": email, "users": {"school_id": school_id}}
+                for email, school_id in conn.execute(
+                    "SELECT cs.student_email, u.school_id FROM class_students cs "
+                    "JOIN users u ON u.email = cs.student_email WHERE cs.class_id = ?",
+                    (class_id,),
+                )
+            ]
+        return await self._run("class_students.roster", work)
+
+    async def count_class_students(self, class_id: str) -> int:
+        def work(conn):
+            return conn.execute("SELECT COUNT(*) FROM class_students WHERE class_id = ?", (class_id,)).fetchone()[0]
+        return await self._run("class_students.count", work)
+
+    # Embeddings
+    async def get_face_embedding(self, student_id: str) -> Optional[str]:
+        def work(conn):
+            row = conn.execute(
+                "SELECT face_embedding_json FROM student_face_embeddings WHERE student_id = ? AND is_active",
+                (student_id,),
+            ).fetchone()
+            return row[0] if row else None
+        return await self._run("embeddings.get", work)
+
+    async def get_face_embeddings(self, student_ids: List[str]) -> List[Dict]:
+        if not student_ids:
+            return []
+
+        def work(conn):
+            return self._rows(conn.execute(
+                f"SELECT student_id, face_embedding_json FROM student_face_embeddings "
+                f"WHERE is_active AND student_id IN ({placeholders(student_ids)})",
+                student_ids,
+            ))
+        return await self._run("embeddings.get_many", work)
+
+    async def get_face_embeddings_page(self, limit: int, after_student_id: Optional[str] = None) -> List[Dict]:
+        def work(conn):
+            return self._rows(conn.execute(
+                "SELECT student_id, face_embedding_json FROM student_face_embeddings "
+                "WHERE is_active AND student_id > ? ORDER BY student_id LIMIT ?",
+                (after_student_id or "", limit),
+            ))
+        return await self._run("embeddings.page", work)
+
+    async def save_face_embedding(self, student_id: str, data: Dict) -> Dict:
+        """Update the student's embedding row, or insert one if there is none"""
+        row = {**data, "student_id": student_id}
+        updates = ",".join(f"{column} = excluded.{column}" for column in row if column != "created_at")
+
+        def work(conn):
+            return self._rows(conn.execute(
+                f"INSERT INTO student_face_embeddings ({','.join(row)}) VALUES ({placeholders(list(row))}) "
+                f"ON CONFLICT (student_id) DO UPDATE SET {updates} RETURNING *",
+                list(row.values()),
+            ))[0]
+        return await self._run("embeddings.save", work)
+
+    # Analytics
+    async def get_class_stats(self, class_id: str) -> Optional[Dict]:
+        def work(conn):
+            return self._rows(conn.execute("SELECT * FROM class_attendance_stats WHERE class_id = ?", (class_id,)))
+        rows = await self._run("analytics.class", work)
+        return rows[0] if rows else None
+
+    async def get_class_session_stats(self, class_id: str, limit: int) -> List[Dict]:
+        def work(conn):
+            return self._rows(conn.execute(
+                "SELECT * FROM session_attendance_stats WHERE class_id = ? ORDER BY started_at DESC LIMIT ?",
+                (class_id, limit),
+            ))
+        return await self._run("analytics.sessions", work)
+
+    async def get_class_student_stats(self, class_id: str) -> List[Dict]:
+        def work(conn):
+            return self._rows(conn.execute(
+                "SELECT * FROM student_attendance_stats WHERE class_id = ? ORDER BY student_email", (class_id,)
+            ))
+        return await self._run("analytics.class_students", work)
+
+    async def get_session_stats(self, session_ids: List[str]) -> List[Dict]:
+        if not session_ids:
+            return []
+
+        def work(conn):
+            return self._rows(conn.execute(
+                f"SELECT session_id, present_count, late_count, absent_count FROM session_attendance_stats "
+                f"WHERE session_id IN ({placeholders(session_ids)})",
+                session_ids,
+            ))
+        return await self._run("analytics.session_many", work)
+
+    async def get_student_stats(self, student_email: str) -> List[Dict]:
+        def work(conn):
+            return self._rows(conn.execute(
+                "SELECT * FROM student_attendance_stats WHERE student_email = ?", (student_email,)
+            ))
+        return await self._run("analytics.student", work)
+
+    async def refresh_student_stats(self, session_ids: List[str], student_emails: List[str]) -> int:
+        if not session_ids or not student_emails:
+            return 0
+
+        # Same result as migrations/010_refresh_student_stats.sql
+        def work(conn):
+            class_ids = [row[0] for row in conn.execute(
+                f"SELECT DISTINCT class_id FROM attendance_sessions WHERE id IN ({placeholders(session_ids)})",
+                session_ids,
+            )]
+            if not class_ids:
+                return 0
+            stats: Dict[Tuple[str, str], Dict] = {}
+            for class_id, student_email, status in conn.execute(
+                f"SELECT s.class_id, r.student_email, r.status FROM attendance_records r "
+                f"JOIN attendance_sessions s ON s.id = r.session_id "
+                f"WHERE s.class_id IN ({placeholders(class_ids)}) "
+                f"AND r.student_email IN ({placeholders(student_emails)}) "
+                f"ORDER BY s.start_time",
+                [*class_ids, *student_emails],
+            ):
+                row = stats.setdefault((class_id, student_email), {
+                    "present": 0, "late": 0, "absent": 0, "current": 0, "longest": 0, "last": None
+                })
+                row[status] += 1
+                row["current"] = 0 if status == "absent" else row["current"] + 1
+                row["longest"] = max(row["longest"], row["current"])
+                row["last"] = status
+            conn.executemany(
+                "INSERT INTO student_attendance_stats (class_id, student_email, present_count, late_count, "
+                "absent_count, current_streak, longest_streak, last_status) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (class_id, student_email) DO UPDATE SET "
+                "present_count = excluded.present_count, late_count = excluded.late_count, "
+                "absent_count = excluded.absent_count, current_streak = excluded.current_streak, "
+                "longest_streak = excluded.longest_streak, last_status = excluded.last_status, "
+                "updated_at = CURRENT_TIMESTAMP",
+                [
+                    (class_id, email, row["present"], row["late"], row["absent"],
+                     row["current"], row["longest"], row["last"])
+                    for (class_id, email), row in stats.items()
+                ],
+            )
+            return len(stats)
+        return await self._run("analytics.refresh_students", work)
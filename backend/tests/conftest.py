@@ -0,0 +1,85 @@
+# tests/conftest.py
+import os
+import sys
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlite_database import SQLiteDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / "attendance.db"))
+    yield database
+    asyncio.run(database.close())
+
+
+@pytest.fixture
+def make_session(db):
+    """Insert a session (and its class roster) directly; returns the session id"""
+    def make(session_id: str, class_id: str = "class-1", start_time: str = "2024-01-01T09:00:00",
+             status: str = "active", students=()):
+        conn = sqlite3.connect(db.path)
+        db.conn  # creates the schema
+        with conn:
+            conn.execute(
+                "INSERT INTO attendance_sessions (id, class_id, start_time, end_time, on_time_limit_minutes, status) "
+                "VALUES (?, ?, ?, ?, 15, ?)",
+                (session_id, class_id, start_time, start_time, status),
+            )
+            for email, school_id in students:
+                conn.execute("INSERT OR IGNORE INTO users (email, school_id) VALUES (?, ?)", (email, school_id))
+                conn.execute(
+                    "INSERT OR IGNORE INTO class_students (class_id, student_email) VALUES (?, ?)",
+                    (class_id, email),
+                )
+        conn.close()
+        return session_id
+    return make
+
+
+@pytest.fixture(scope="session")
+def api(tmp_path_factory):
+    """The FastAPI app on a throwaway SQLite database, started once for the run; yields (main, client)"""
+    pytest.importorskip("fastapi")
+    pytest.importorskip("face_recognition")
+    root = tmp_path_factory.mktemp("api")
+    os.environ.update({
+        "DATABASE_BACKEND": "sqlite",
+        "SQLITE_DATABASE_PATH": str(root / "attendance.db"),
+        "WRITE_BEHIND_JOURNAL": str(root / "journal.db"),
+        "SNAPSHOT_ENABLED": "false",
+    })
+    import main
+    from fastapi.testclient import TestClient
+
+    with TestClient(main.app) as client:
+        yield main, client
+
+
+@pytest.fixture
+def enroll(api):
+    """Enroll students, each with a face embedding or None, in a class of the app's database"""
+    main, _ = api
+
+    def add(class_id: str, students):
+        conn = sqlite3.connect(main.db.path)
+        with conn:
+            for email, school_id, embedding in students:
+                conn.execute("INSERT OR IGNORE INTO users (email, school_id) VALUES (?, ?)", (email, school_id))
+                conn.execute(
+                    "INSERT OR IGNORE INTO class_students (class_id, student_email) VALUES (?, ?)",
+                    (class_id, email),
+                )
+                if embedding is not None:
+                    conn.execute(
+                        "INSERT INTO student_face_embeddings (student_id, face_embedding_json) VALUES (?, ?)",
+                        (school_id, json.dumps(list(embedding))),
+                    )
+        conn.close()
+    return add
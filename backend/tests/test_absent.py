@@ -0,0 +1,17 @@
+# tests/test_absent.py
+import asyncio
+
+
+def test_mark_absent_skips_checked_in_students(db, make_session):
+    make_session("s1", status="ended", students=[("a@school.edu", "A1"), ("b@school.edu", "B1")])
+
+    async def run():
+        await db.record_checkin("s1", "a@school.edu", "A1", "2024-01-01T09:01:00", "present", None)
+        pending = await db.get_sessions_pending_absent()
+        marked = await db.mark_absent_students("s1")
+        return pending, marked, await db.mark_absent_students("s1"), await db.get_sessions_pending_absent()
+
+    pending, marked, remarked, pending_after = asyncio.run(run())
+    assert pending == [{"id": "s1"}]
+    assert (marked, remarked) == (1, 0)
+    assert pending_after == []
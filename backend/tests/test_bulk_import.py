@@ -0,0 +1,107 @@
+# tests/test_bulk_import.py
+import io
+import asyncio
+
+import bulk_import
+
+CSV = (
+    "session_id,student_email,check_in_time,status\n"
+    "s3,a@school.edu,2024-01-03T09:00:00,present\n"
+    "s1,a@school.edu,2024-01-01T09:00:00,present\n"
+    "s2,a@school.edu,2024-01-02T09:00:00,absent\n"
+    "s2,b@school.edu,2024-01-02T09:00:00,not-a-status\n"
+)
+
+
+def make_sessions(make_session):
+    for day in (1, 2, 3):
+        make_session(f"s{day}", start_time=f"2024-01-0{day}T09:00:00", status="ended",
+                     students=[("a@school.edu", "A1"), ("b@school.edu", "B1")])
+
+
+def test_attendance_import_streaks_follow_session_order(db, make_session, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_sessions(make_session)
+    imported = []
+
+    async def run():
+        summary = await bulk_import.run_import(
+            db, "attendance_records", io.StringIO(CSV), "history", chunk_size=2, on_imported=imported.extend
+        )
+        return summary, await db.get_student_stats("a@school.edu")
+
+    summary, stats = asyncio.run(run())
+    assert summary["imported_rows"] == 3 and summary["rejected_rows"] == 1
+    assert len(imported) == 3
+    # present, absent, present by session start time, though the CSV put the absence last
+    assert stats[0]["current_streak"] == 1 and stats[0]["longest_streak"] == 1
+    assert (stats[0]["present_count"], stats[0]["absent_count"], stats[0]["last_status"]) == (2, 1, "present")
+
+
+def test_import_resume_skips_completed_chunks(db, make_session, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_sessions(make_session)
+    calls = []
+    insert_records = db.insert_records
+
+    async def counting_insert(records):
+        calls.append(len(records))
+        return await insert_records(records)
+
+    monkeypatch.setattr(db, "insert_records", counting_insert)
+
+    async def run():
+        first = await bulk_import.run_import(db, "attendance_records", io.StringIO(CSV), "history", chunk_size=2)
+        resumed = await bulk_import.run_import(db, "attendance_records", io.StringIO(CSV), "history", chunk_size=2)
+        fresh = await bulk_import.run_import(db, "attendance_records", io.StringIO(CSV), "again", chunk_size=2)
+        return first, resumed, fresh
+
+    first, resumed, fresh = asyncio.run(run())
+    assert calls == [2, 1, 2, 1]
+    assert resumed == first
+    # A new import id re-sends everything; existing records are kept and skipped
+    assert fresh["imported_rows"] == 0 and fresh["skipped_rows"] == 3
+
+
+def test_failed_refresh_is_redone_on_resume(db, make_session, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_sessions(make_session)
+    refresh_student_stats = db.refresh_student_stats
+    failures = []
+
+    async def flaky_refresh(session_ids, student_emails):
+        if not failures:
+            failures.append(session_ids)
+            raise ConnectionError("database unreachable")
+        return await refresh_student_stats(session_ids, student_emails)
+
+    monkeypatch.setattr(db, "refresh_student_stats", flaky_refresh)
+
+    async def run():
+        first = await bulk_import.run_import(db, "attendance_records", io.StringIO(CSV), "history", chunk_size=4)
+        resumed = await bulk_import.run_import(db, "attendance_records", io.StringIO(CSV), "history", chunk_size=4)
+        return first, resumed, await db.get_student_stats("a@school.edu")
+
+    first, resumed, stats = asyncio.run(run())
+    assert len(first["failed_chunks"]) == 1
+    # The records were inserted by the failed run, so the resume only skips them, yet still refreshes
+    assert resumed["skipped_rows"] == 3 and not resumed["failed_chunks"]
+    assert stats[0]["current_streak"] == 1 and stats[0]["longest_streak"] == 1
+
+
+def test_concurrent_chunk_saves_keep_a_complete_checkpoint(tmp_path):
+    state = bulk_import.ImportState("history", "users", 1, state_dir=str(tmp_path))
+
+    async def finish(index):
+        state.chunks[index] = {"chunk": index, "imported": 1, "errors": []}
+        state.completed.add(index)
+        await state.save()
+
+    async def run():
+        await asyncio.gather(*(finish(index) for index in range(20)))
+
+    asyncio.run(run())
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["history.json"]
+    reloaded = bulk_import.ImportState("history", "users", 1, state_dir=str(tmp_path))
+    assert reloaded.completed == set(range(20))
+    assert reloaded.summary()["imported_rows"] == 20
@@ -0,0 +1,51 @@
+import time
+
+from cache import MISSING, TTLCache
+
+
+def test_get_set_and_hit_ratio():
+    cache = TTLCache("test", ttl=60, max_size=10)
+    assert cache.get("a") is MISSING
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache("test", ttl=10, max_size=10, negative_ttl=2)
+    cache.set("a", 1)
+    cache.set_negative("gone")
+    assert cache.get("gone") is None
+
+    now[0] += 5
+    assert cache.get("a") == 1
+    # Negative entries live for negative_ttl only
+    assert cache.get("gone") is MISSING
+
+    now[0] += 5
+    assert cache.get("a") is MISSING
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache("test", ttl=60, max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_and_clear():
+    cache = TTLCache("test", ttl=60, max_size=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.invalidate("a")
+    assert cache.get("a") is MISSING and cache.get("b") == 2
+    cache.clear()
+    assert cache.get("b") is MISSING
@@ -0,0 +1,63 @@
+# tests/test_camera_pipeline.py
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("face_recognition")
+
+from camera_pipeline import HOG_MIN_FACE_SIZE, CameraPipeline, DetectionRegion, MotionGate, get_camera_pipeline
+
+
+def frame(value: int = 0, square_at=None):
+    image = np.full((240, 320, 3), value, dtype=np.uint8)
+    if square_at is not None:
+        x, y = square_at
+        image[y:y + 80, x:x + 80] = 255
+    return image
+
+
+def test_gate_skips_still_frames_and_passes_motion():
+    gate = MotionGate(use_cascade=False, keyframe_seconds=0)
+    assert gate.check(frame(square_at=(20, 20)), now=0.0)
+    assert not gate.check(frame(square_at=(20, 20)), now=0.1)
+    assert gate.check(frame(square_at=(200, 120)), now=0.2)
+    assert gate.stats()["skipped_motion"] == 1
+
+
+def test_gate_forces_a_keyframe_in_a_still_scene():
+    gate = MotionGate(use_cascade=False, keyframe_seconds=5)
+    still = frame(square_at=(20, 20))
+    assert gate.check(still, now=0.0)
+    assert not gate.check(still, now=4.0)
+    assert gate.check(still, now=5.0)
+    assert not gate.check(still, now=6.0)
+    # Motion passes restart the interval
+    assert gate.check(frame(square_at=(200, 120)), now=8.0)
+    assert not gate.check(frame(square_at=(200, 120)), now=12.0)
+    assert gate.stats()["keyframes"] == 2
+
+
+def test_region_crop_maps_fractions_to_pixels():
+    region = DetectionRegion(roi=[0.25, 0.5, 0.5, 0.5])
+    cropped, offset = region.crop(frame())
+    assert cropped.shape[:2] == (120, 160)
+    assert offset == (80, 120)
+    # Out-of-frame fractions are clamped, never empty
+    cropped, offset = DetectionRegion(roi=[0.9, 0.9, 0.5, 0.5]).crop(frame())
+    assert offset == (288, 216) and cropped.shape[:2] == (24, 32)
+    assert DetectionRegion().crop(frame())[1] == (0, 0)
+
+
+def test_region_detector_scale_keeps_smallest_face_detectable():
+    assert DetectionRegion().detector_scale() == (1.0, 1)
+    # Faces twice the detector minimum: downscale by half, no upsampling
+    assert DetectionRegion(min_face_size=HOG_MIN_FACE_SIZE * 2).detector_scale() == (0.5, 0)
+    # Faces half the minimum: upsample once instead
+    assert DetectionRegion(min_face_size=HOG_MIN_FACE_SIZE // 2).detector_scale() == (1.0, 1)
+
+
+def test_pipeline_region_changes_only_when_configured():
+    pipeline = CameraPipeline("test-camera")
+    pipeline.configure_region([0.1, 0.1, 0.5, 0.5], 40, 200)
+    assert pipeline.region.roi == [0.1, 0.1, 0.5, 0.5]
+    assert get_camera_pipeline("other-camera").region.roi is None
@@ -0,0 +1,36 @@
+# tests/test_checkin.py
+import asyncio
+
+
+def test_record_checkin_is_idempotent(db, make_session):
+    make_session("s1", students=[("a@school.edu", "A1")])
+
+    async def run():
+        first = await db.record_checkin("s1", "a@school.edu", "A1", "2024-01-01T09:01:00", "present", 0.41)
+        second = await db.record_checkin("s1", "a@school.edu", "A1", "2024-01-01T09:20:00", "late", 0.38)
+        return first, second, await db.checkin_context("s1", "a@school.edu"), await db.get_session_records("s1")
+
+    first, second, context, records = asyncio.run(run())
+    assert first["inserted"] and first["record"]["status"] == "present"
+    assert second == {"inserted": False}
+    assert context["already_checked_in"] and context["student_id"] == "A1"
+    assert [(r["status"], r["check_in_time"]) for r in records] == [("present", "2024-01-01T09:01:00")]
+
+
+def test_insert_records_returns_only_new_rows(db, make_session):
+    make_session("s1", students=[("a@school.edu", "A1"), ("b@school.edu", "B1")])
+    record = {"session_id": "s1", "student_email": "a@school.edu", "student_id": "A1",
+              "check_in_time": "2024-01-01T09:01:00", "status": "present", "created_at": "2024-01-01T09:01:00"}
+
+    async def run():
+        await db.record_checkin("s1", "b@school.edu", "B1", "2024-01-01T09:00:00", "present", None)
+        first = await db.insert_records([record, {**record, "student_email": "b@school.edu", "student_id": "B1"}])
+        replay = await db.insert_records([record])
+        return first, replay, await db.get_session_stats(["s1"])
+
+    first, replay, stats = asyncio.run(run())
+    assert [r["student_email"] for r in first] == ["a@school.edu"]
+    assert replay == []
+    # The aggregate trigger saw each student once
+    assert stats[0]["present_count"] == 2
+
@@ -0,0 +1,96 @@
+import asyncio
+
+from events import SessionEventHub
+
+
+async def take(stream, count):
+    return [await stream.__anext__() for _ in range(count)]
+
+
+def test_live_events_reach_every_subscriber():
+    async def run():
+        hub = SessionEventHub()
+        first = hub.subscribe("s1")
+        second = hub.subscribe("s1")
+        # Start both streams so they are registered before publishing
+        pending = [asyncio.ensure_future(take(first, 2)), asyncio.ensure_future(take(second, 2))]
+        await asyncio.sleep(0)
+        hub.publish("s1", "checkin", {"email": "a@school.edu"})
+        hub.publish("s1", "checkin", {"email": "b@school.edu"})
+        return await asyncio.gather(*pending)
+
+    for events in asyncio.run(run()):
+        assert [event.id for event in events] == [1, 2]
+        assert events[1].data == {"email": "b@school.edu"}
+
+
+def test_resume_replays_events_after_last_event_id():
+    async def run():
+        hub = SessionEventHub()
+        for index in range(3):
+            hub.publish("s1", "checkin", {"index": index})
+        return await take(hub.subscribe("s1", last_event_id=1), 2)
+
+    events = asyncio.run(run())
+    assert [event.id for event in events] == [2, 3]
+
+
+def test_truncated_history_sends_reset():
+    async def run():
+        hub = SessionEventHub(history_size=2)
+        for index in range(5):
+            hub.publish("s1", "checkin", {"index": index})
+        return await take(hub.subscribe("s1", last_event_id=1), 3)
+
+    events = asyncio.run(run())
+    assert events[0].type == "reset"
+    assert [event.id for event in events[1:]] == [4, 5]
+
+
+def test_heartbeat_when_idle():
+    async def run():
+        hub = SessionEventHub(heartbeat_seconds=0.01)
+        return await take(hub.subscribe("s1"), 1)
+
+    assert asyncio.run(run()) == [None]
+
+
+def test_slow_subscriber_is_disconnected_and_can_resume():
+    async def run():
+        hub = SessionEventHub(queue_size=1)
+        stream = hub.subscribe("s1")
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        # Nothing is read in between, so the second event overflows the queue
+        hub.publish("s1", "checkin", {"index": 0})
+        hub.publish("s1", "checkin", {"index": 1})
+        try:
+            await pending
+        except StopAsyncIteration:
+            pass
+        subscribers = hub.stats()["subscribers"]
+        return subscribers, await take(hub.subscribe("s1", last_event_id=0), 2)
+
+    subscribers, replayed = asyncio.run(run())
+    assert subscribers == 0
+    assert [event.data["index"] for event in replayed] == [0, 1]
+
+
+def test_end_closes_streams_and_late_subscribers_see_it():
+    async def run():
+        hub = SessionEventHub()
+        stream = hub.subscribe("s1")
+        pending = asyncio.ensure_future(take(stream, 1))
+        await asyncio.sleep(0)
+        hub.publish("s1", "checkin", {})
+        await pending
+        hub.end("s1", {"status": "ended"})
+        hub.end("s1", {"status": "ended"})
+        rest = [event async for event in stream]
+        late = [event async for event in hub.subscribe("s1")]
+        return hub, rest, late
+
+    hub, rest, late = asyncio.run(run())
+    assert [event.type for event in rest] == ["session_ended"]
+    assert [event.type for event in late] == ["session_ended"]
+    assert hub.stats()["published"] == 2
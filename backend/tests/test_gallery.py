@@ -0,0 +1,60 @@
+import json
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from gallery import FaceGallery
+
+
+def vector(*values):
+    return list(values) + [0.0] * (128 - len(values))
+
+
+def test_nearest_orders_by_distance_and_excludes_self():
+    gallery = FaceGallery()
+    gallery.upsert("a", vector(0.0))
+    gallery.upsert("b", vector(0.3))
+    gallery.upsert("c", vector(1.0))
+
+    nearest = gallery.nearest(vector(0.0), k=2, exclude="a")
+    assert [match["student_id"] for match in nearest] == ["b", "c"]
+    assert nearest[0]["distance"] == pytest.approx(0.3, abs=1e-4)
+    # Asking for more than there are returns every other student
+    assert len(gallery.nearest(vector(0.0), k=10, exclude="a")) == 2
+
+
+def test_upsert_replaces_and_grows_past_initial_capacity():
+    gallery = FaceGallery()
+    for index in range(1500):
+        gallery.upsert(f"s{index}", vector(float(index)))
+    gallery.upsert("s0", vector(5000.0))
+
+    assert gallery.size == 1500
+    assert gallery.nearest(vector(4999.0), k=1)[0]["student_id"] == "s0"
+
+
+def test_load_pages_and_retries_after_failure():
+    rows = [{"student_id": f"s{index}", "face_embedding_json": json.dumps(vector(float(index)))} for index in range(5)]
+    calls = []
+
+    async def fetch_page(limit, after):
+        calls.append(after)
+        if len(calls) == 2:
+            raise ConnectionError("database unreachable")
+        start = 0 if after is None else int(after[1:]) + 1
+        return rows[start:start + limit]
+
+    async def run():
+        gallery = FaceGallery(page_size=2)
+        gallery.start_loading(fetch_page)
+        first = await gallery.ready()
+        second = await gallery.ready()
+        return gallery, first, second
+
+    gallery, first, second = asyncio.run(run())
+    assert (first, second) == (False, True)
+    assert gallery.size == 5
+    stats = gallery.stats()
+    assert stats["loaded"] and stats["load_failures"] == 1
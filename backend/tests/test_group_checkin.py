@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+def face(seed: int):
+    return np.random.default_rng(seed).normal(0, 0.1, 128)
+
+
+def test_match_faces_one_to_one_closest_first(api):
+    main, _ = api
+    roster = np.array([face(0), face(0) + 0.04])
+    # Both faces are nearest to student 0: the closer one gets them, the other falls back to student 1
+    faces = [roster[0] + 0.01, roster[0] + 0.015, face(2)]
+
+    matches = main.match_faces_to_roster(faces, roster, threshold=0.6)
+    assert [(match["face_index"], match["roster_index"]) for match in matches] == [(0, 0), (1, 1)]
+    assert main.match_faces_to_roster([], roster) == []
+
+
+def test_group_photo_checks_in_recognised_students(api, enroll, monkeypatch):
+    main, client = api
+    class_id = f"group-{time.monotonic_ns()}"
+    students = [(f"{name}@{class_id}.edu", f"{class_id}-{name}", face(seed)) for seed, name in enumerate("abc")]
+    enroll(class_id, students)
+    session_id = client.post(
+        "/api/attendance/session/create", json={"class_id": class_id, "teacher_email": "t@school.edu"}
+    ).json()["session_id"]
+
+    locations = [(0, 10, 10, 0), (0, 30, 10, 20), (0, 50, 10, 40)]
+    monkeypatch.setattr(main, "process_group_image", lambda image_bytes: {
+        "face_locations": locations,
+        "face_encodings": [students[1][2], students[0][2] + 0.01, face(99)],
+    })
+
+    def upload():
+        return client.post(
+            f"/api/attendance/session/{session_id}/group-checkin",
+            files={"file": ("class.jpg", b"jpeg", "image/jpeg")},
+        ).json()
+
+    first = upload()
+    assert first["face_count"] == 3
+    assert sorted(student["student_email"] for student in first["checked_in"]) == [students[0][0], students[1][0]]
+    assert first["unmatched_faces"] == [{"face_index": 2, "face_location": [0, 50, 10, 40]}]
+
+    records = client.get(f"/api/attendance/session/{session_id}/records").json()["records"]
+    assert sorted(record["student_email"] for record in records) == [students[0][0], students[1][0]]
+
+    # A second photo records nobody twice
+    second = upload()
+    assert second["checked_in"] == []
+    assert len(second["already_checked_in"]) == 2
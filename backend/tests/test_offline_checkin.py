@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from database import DatabaseError
+
+CAMERA = {"ip_address": "127.0.0.1", "port": 8080}
+
+
+def face(seed: int):
+    return np.random.default_rng(seed).normal(0, 0.1, 128)
+
+
+@pytest.fixture
+def classroom(api, enroll, monkeypatch):
+    """An active session whose roster has finished warming; the camera always sees `seen[0]`"""
+    main, client = api
+    class_id = f"offline-{time.monotonic_ns()}"
+    students = [(f"{name}@{class_id}.edu", f"{class_id}-{name}", face(seed)) for seed, name in enumerate("ab")]
+    enroll(class_id, students)
+
+    session_id = client.post(
+        "/api/attendance/session/create", json={"class_id": class_id, "teacher_email": "t@school.edu"}
+    ).json()["session_id"]
+    while main.session_contexts.peek(session_id) is None:
+        time.sleep(0.01)
+
+    seen = [students[0][2]]
+
+    async def capture(config):
+        return b"jpeg"
+
+    monkeypatch.setattr(main, "capture_from_ip_webcam", capture)
+    monkeypatch.setattr(main, "process_face_image", lambda image_bytes, region=None: {
+        "success": True, "face_encoding": seen[0], "face_location": (0, 10, 10, 0)
+    })
+    return main, client, session_id, students, seen
+
+
+def check_in(client, session_id, email):
+    return client.post(
+        "/api/attendance/checkin",
+        json={"session_id": session_id, "student_email": email, "webcam_config": CAMERA},
+    )
+
+
+def wait_for_record(main, client, session_id, email):
+    for _ in range(200):
+        records = client.get(f"/api/attendance/session/{session_id}/records").json()["records"]
+        if any(record["student_email"] == email for record in records):
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"{email} never reached the database")
+
+
+def test_degraded_database_checks_in_against_warmed_roster(classroom, monkeypatch):
+    main, client, session_id, students, seen = classroom
+    degraded = [True]
+    monkeypatch.setattr(type(main.db), "degraded", property(lambda self: degraded[0]))
+
+    response = check_in(client, session_id, students[0][0])
+    assert response.status_code == 200 and response.json()["offline"]
+
+    # The face is still verified against the roster held in memory
+    assert check_in(client, session_id, students[1][0]).status_code == 403
+    assert check_in(client, session_id, f"stranger@{session_id}.edu").status_code == 403
+    assert check_in(client, "no-such-session", students[0][0]).status_code == 503
+
+    degraded[0] = False
+    # Journaled offline, written once the writer flushes
+    wait_for_record(main, client, session_id, students[0][0])
+
+
+def test_transient_insert_failure_is_journaled(classroom, monkeypatch):
+    main, client, session_id, students, seen = classroom
+
+    async def unreachable(*args, **kwargs):
+        raise DatabaseError("connection refused")
+
+    monkeypatch.setattr(main.db, "record_checkin", unreachable)
+    seen[0] = students[1][2]
+    response = check_in(client, session_id, students[1][0])
+    assert response.status_code == 200 and response.json()["offline"]
+
+    wait_for_record(main, client, session_id, students[1][0])
+    assert check_in(client, session_id, students[1][0]).status_code == 400
@@ -0,0 +1,44 @@
+# tests/test_records_paging.py
+import asyncio
+
+
+def test_session_records_page_by_seq(db, make_session):
+    make_session("s1")
+    make_session("s2")
+    # check_in_time deliberately out of insertion order: paging follows seq
+    times = ["09:05", "09:01", "09:03", "09:02", "09:04"]
+
+    async def run():
+        for index, time in enumerate(times):
+            await db.record_checkin("s1", f"{index}@school.edu", str(index), f"2024-01-01T{time}:00", "present", None)
+            await db.record_checkin("s2", f"{index}@school.edu", str(index), f"2024-01-01T{time}:00", "present", None)
+
+        pages, after = [], None
+        while True:
+            page = await db.get_session_records_page("s1", "seq,txid,student_email", 2, after)
+            pages.append(page)
+            if len(page) < 2:
+                return pages
+            after = {"txid": page[-1]["txid"], "seq": page[-1]["seq"]}
+
+    pages = asyncio.run(run())
+    assert [len(page) for page in pages] == [2, 2, 1]
+    rows = [row for page in pages for row in page]
+    assert [row["student_email"] for row in rows] == [f"{index}@school.edu" for index in range(5)]
+    assert [row["seq"] for row in rows] == sorted(row["seq"] for row in rows)
+
+
+def test_session_records_page_sees_rows_inserted_behind_cursor(db, make_session):
+    make_session("s1")
+
+    async def run():
+        await db.record_checkin("s1", "a@school.edu", "A", "2024-01-01T09:05:00", "present", None)
+        first = await db.get_session_records_page("s1", "seq,txid,student_email", 10)
+        # Earlier check_in_time, inserted after the first page was read
+        await db.record_checkin("s1", "b@school.edu", "B", "2024-01-01T09:00:00", "present", None)
+        after = {"txid": first[-1]["txid"], "seq": first[-1]["seq"]}
+        return first, await db.get_session_records_page("s1", "seq,txid,student_email", 10, after)
+
+    first, rest = asyncio.run(run())
+    assert [row["student_email"] for row in first] == ["a@school.edu"]
+    assert [row["student_email"] for row in rest] == ["b@school.edu"]
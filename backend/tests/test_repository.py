@@ -0,0 +1,19 @@
+# tests/test_repository.py
+import pytest
+
+from repository import AttendanceRepository
+from sqlite_database import SQLiteDatabase
+
+
+def test_incomplete_backend_fails_on_creation():
+    class Partial(AttendanceRepository):
+        async def get_active_session(self, session_id):
+            return None
+
+    with pytest.raises(TypeError, match="abstract"):
+        Partial()
+
+
+def test_sqlite_backend_implements_the_interface(db):
+    assert isinstance(db, SQLiteDatabase)
+    assert not SQLiteDatabase.__abstractmethods__
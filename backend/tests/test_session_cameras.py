@@ -0,0 +1,24 @@
+# tests/test_session_cameras.py
+import asyncio
+
+
+def test_camera_is_kept_off_the_session_row(db, make_session):
+    make_session("s1", students=[("a@school.edu", "A1")])
+    camera = {"ip_address": "10.0.0.5", "port": 8080, "username": "admin", "password": "secret", "roi": None}
+
+    async def run():
+        await db.set_session_webcam_config("s1", camera)
+        saved = await db.get_session_webcam_configs(["s1", "s2"])
+        session = await db.get_active_session("s1")
+        context = await db.checkin_context("s1", "a@school.edu")
+        await db.set_session_webcam_config("s1", {**camera, "port": 8081})
+        updated = await db.get_session_webcam_configs(["s1"])
+        await db.set_session_webcam_config("s1", None)
+        return saved, session, context, updated, await db.get_session_webcam_configs(["s1"])
+
+    saved, session, context, updated, cleared = asyncio.run(run())
+    assert saved == {"s1": camera}
+    assert "webcam_config" not in session
+    assert "secret" not in str(context)
+    assert updated["s1"]["port"] == 8081
+    assert cleared == {}
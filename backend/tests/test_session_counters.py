@@ -0,0 +1,39 @@
+from session_counters import SessionCounters
+
+
+def test_counts_and_remaining():
+    counters = SessionCounters()
+    counters.init("s1", None)
+    counters.record("s1", "present")
+    counters.record("s1", "late")
+    counters.record("s1", "unknown")
+    assert counters.get("s1")["remaining"] is None
+
+    counters.set_roster_size("s1", 5)
+    assert counters.get("s1") == {
+        "roster_size": 5, "present": 1, "late": 1, "absent": 0, "ended": False, "remaining": 3
+    }
+
+
+def test_end_adds_absent_students():
+    counters = SessionCounters()
+    counters.init("s1", 3, present=1)
+    counters.end("s1", 2)
+    assert counters.get("s1")["absent"] == 2
+    assert counters.get("s1")["ended"] and counters.get("s1")["remaining"] == 0
+
+
+def test_unknown_sessions_are_ignored():
+    counters = SessionCounters()
+    counters.record("s1", "present")
+    counters.end("s1", 4)
+    counters.set_roster_size("s1", 4)
+    assert counters.get("s1") is None
+
+
+def test_oldest_session_is_dropped_past_the_limit():
+    counters = SessionCounters(max_sessions=2)
+    for session_id in ("s1", "s2", "s3"):
+        counters.init(session_id, 10)
+    assert counters.get("s1") is None
+    assert counters.get("s3")["remaining"] == 10
@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from session_scheduler import SessionExpiryScheduler
+
+
+def iso(seconds: float) -> str:
+    return (datetime.now() + timedelta(seconds=seconds)).isoformat()
+
+
+def test_expires_sessions_loaded_on_start():
+    ended = []
+
+    async def load():
+        return [{"id": "s1", "end_time": iso(-1)}, {"id": "s2", "end_time": iso(3600)}]
+
+    async def end(ids):
+        ended.extend(ids)
+
+    async def run():
+        scheduler = SessionExpiryScheduler(load, end, max_sleep=0.05, resync_interval=10)
+        await scheduler.start()
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert ended == ["s1"]
+    assert scheduler.stats()["scheduled"] == 1
+
+
+def test_resync_picks_up_sessions_created_elsewhere():
+    active = [{"id": "s1", "end_time": iso(3600)}]
+    ended = []
+
+    async def load():
+        return list(active)
+
+    async def end(ids):
+        ended.extend(ids)
+        active[:] = [s for s in active if s["id"] not in ids]
+
+    async def run():
+        scheduler = SessionExpiryScheduler(load, end, max_sleep=10, resync_interval=0.05)
+        await scheduler.start()
+        await asyncio.sleep(0.02)
+        # Inserted by the app straight into the database, already expired
+        active.append({"id": "s2", "end_time": iso(-1)})
+        await asyncio.sleep(0.15)
+        await scheduler.stop()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert ended == ["s2"]
+    assert scheduler.stats()["syncs"] >= 2
+
+
+def test_resync_reschedules_changed_end_time():
+    active = [{"id": "s1", "end_time": iso(3600)}]
+    ended = []
+
+    async def load():
+        return list(active)
+
+    async def end(ids):
+        ended.extend(ids)
+        active[:] = [s for s in active if s["id"] not in ids]
+
+    async def run():
+        scheduler = SessionExpiryScheduler(load, end, max_sleep=10, resync_interval=0.05)
+        await scheduler.start()
+        await asyncio.sleep(0.02)
+        active[0] = {"id": "s1", "end_time": iso(-1)}
+        await asyncio.sleep(0.15)
+        await scheduler.stop()
+
+    asyncio.run(run())
+    assert ended == ["s1"]
+
+
+def test_failed_load_is_retried():
+    attempts = []
+
+    async def load():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("database unreachable")
+        return [{"id": "s1", "end_time": iso(-1)}]
+
+    ended = []
+
+    async def end(ids):
+        ended.extend(ids)
+
+    async def run():
+        scheduler = SessionExpiryScheduler(load, end, max_sleep=0.05, retry_interval=0.02, resync_interval=10)
+        await scheduler.start()
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.loaded
+    assert ended == ["s1"]
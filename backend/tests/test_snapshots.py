@@ -0,0 +1,102 @@
+import os
+import time
+import asyncio
+from datetime import datetime
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from snapshots import LocalBlobStore, SnapshotWriter, snapshot_key, thumbnail_key
+
+
+def jpeg(width=64, height=48):
+    ok, encoded = cv2.imencode(".jpg", np.full((height, width, 3), 128, np.uint8))
+    return encoded.tobytes()
+
+
+def test_keys_are_safe_and_thumbnails_sit_next_to_snapshot():
+    key = snapshot_key("s1", "a@school.edu/../x", datetime(2024, 1, 1, 9, 0, 0, 5))
+    assert key == "s1/a_school.edu_.._x-20240101T090000000005.jpg"
+    assert thumbnail_key(key, "a@school.edu") == "s1/a_school.edu_.._x-20240101T090000000005.a_school.edu.thumb.jpg"
+
+
+def test_prune_removes_expired_then_oldest_over_cap(tmp_path):
+    store = LocalBlobStore(str(tmp_path), "/snapshots")
+    for index, age in enumerate((3000, 20, 10)):
+        store.put(f"s1/{index}.jpg", b"x" * 100, "image/jpeg")
+        mtime = time.time() - age
+        os.utime(tmp_path / "s1" / f"{index}.jpg", (mtime, mtime))
+
+    assert store.prune(max_age_seconds=1000, max_bytes=1000) == 1
+    assert store.prune(max_age_seconds=1000, max_bytes=100) == 1
+    assert sorted(os.listdir(tmp_path / "s1")) == ["2.jpg"]
+    assert store.prune(max_age_seconds=0, max_bytes=0) == 1
+    assert os.listdir(tmp_path) == []
+
+
+def test_group_snapshot_is_stored_once_with_a_thumbnail_per_face(tmp_path):
+    updates = []
+
+    async def update_url(session_id, student_email, url):
+        updates.append((session_id, student_email, url))
+        return True
+
+    async def run():
+        writer = SnapshotWriter(LocalBlobStore(str(tmp_path), "/snapshots"), update_url, thumbnail_size=16)
+        writer.start()
+        writer.submit("s1", jpeg(), [("a@school.edu", (0, 30, 30, 0)), ("b@school.edu", (10, 60, 40, 30))])
+        while writer.stats()["stored"] + writer.stats()["failures"] == 0:
+            await asyncio.sleep(0.01)
+        await writer.stop()
+        return writer.stats()
+
+    stats = asyncio.run(run())
+    assert stats["stored"] == 1 and stats["failures"] == 0
+    files = sorted(os.listdir(tmp_path / "s1"))
+    assert len(files) == 3 and sum(name.endswith(".thumb.jpg") for name in files) == 2
+    # Both records point at the one group image
+    assert len({url for _, _, url in updates}) == 1 and "group-" in updates[0][2]
+    thumbnail = cv2.imread(str(tmp_path / "s1" / [name for name in files if name.endswith(".thumb.jpg")][0]))
+    assert thumbnail.shape[:2] == (16, 16)
+
+
+def test_url_update_retries_until_record_is_written(tmp_path):
+    attempts = []
+
+    async def update_url(session_id, student_email, url):
+        attempts.append(student_email)
+        # Still in the write-behind journal for the first two tries
+        return len(attempts) > 2
+
+    async def run():
+        writer = SnapshotWriter(
+            LocalBlobStore(str(tmp_path), "/snapshots"), update_url, update_retry_interval=0.001
+        )
+        writer.start()
+        writer.submit("s1", jpeg(), [("a@school.edu", (0, 30, 30, 0))])
+        while writer.stats()["stored"] + writer.stats()["failures"] == 0:
+            await asyncio.sleep(0.01)
+        await writer.stop()
+        return writer.stats()
+
+    stats = asyncio.run(run())
+    assert stats["stored"] == 1 and len(attempts) == 3
+
+
+def test_full_queue_drops_snapshots(tmp_path):
+    async def update_url(session_id, student_email, url):
+        return True
+
+    async def run():
+        writer = SnapshotWriter(LocalBlobStore(str(tmp_path), "/snapshots"), update_url, queue_size=1, workers=0)
+        writer.start()
+        writer.submit("s1", jpeg(), [("a@school.edu", (0, 30, 30, 0))])
+        writer.submit("s1", jpeg(), [("b@school.edu", (0, 30, 30, 0))])
+        stats = writer.stats()
+        await writer.stop()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["dropped"] == 1 and stats["queue_depth"] == 1
@@ -0,0 +1,48 @@
+# tests/test_tracker.py
+import pytest
+
+pytest.importorskip("numpy")
+
+from face_tracking import TRACK_MAX_AGE_SECONDS, TRACK_REENCODE_SECONDS, FaceTracker, box_iou
+
+
+def test_box_iou():
+    assert box_iou((0, 10, 10, 0), (0, 10, 10, 0)) == 1.0
+    assert box_iou((0, 10, 10, 0), (0, 20, 10, 10)) == 0.0
+    assert box_iou((0, 10, 10, 0), (0, 15, 10, 5)) == pytest.approx(50 / 150)
+
+
+def test_tracks_follow_moving_faces():
+    tracker = FaceTracker()
+    first = tracker.update([(0, 100, 100, 0), (0, 400, 100, 300)], now=0.0)
+    # Listed in the other order and shifted a little: each keeps its track
+    second = tracker.update([(0, 405, 100, 305), (5, 105, 105, 5)], now=0.1)
+    assert [track.track_id for track in second] == [first[1].track_id, first[0].track_id]
+    assert second[1].box == (5, 105, 105, 5)
+
+
+def test_each_track_matches_one_detection():
+    tracker = FaceTracker()
+    (track,) = tracker.update([(0, 100, 100, 0)], now=0.0)
+    overlapping = tracker.update([(0, 100, 100, 0), (0, 110, 100, 10)], now=0.1)
+    assert overlapping[0].track_id == track.track_id
+    assert overlapping[1].track_id != track.track_id
+
+
+def test_stale_tracks_are_dropped():
+    tracker = FaceTracker()
+    (track,) = tracker.update([(0, 100, 100, 0)], now=0.0)
+    (later,) = tracker.update([(0, 100, 100, 0)], now=TRACK_MAX_AGE_SECONDS + 1)
+    assert later.track_id != track.track_id
+
+
+def test_encoding_carried_forward_until_reencode_interval():
+    tracker = FaceTracker()
+    (track,) = tracker.update([(0, 100, 100, 0)], now=0.0)
+    assert track.needs_encoding(0.0)
+    track.encoding, track.encoded_at = [0.0] * 128, 0.0
+    (same,) = tracker.update([(2, 102, 102, 2)], now=1.0)
+    assert same is track and not same.needs_encoding(1.0)
+    assert same.needs_encoding(TRACK_REENCODE_SECONDS)
+    same.ambiguous = True
+    assert same.needs_encoding(1.0)
@@ -0,0 +1,109 @@
+# tests/test_write_behind.py
+import asyncio
+
+from write_behind import RecordWriter
+
+
+def record(session_id: str, email: str) -> dict:
+    return {"session_id": session_id, "student_email": email, "student_id": email[0].upper(),
+            "check_in_time": "2024-01-01T09:01:00", "status": "present", "created_at": "2024-01-01T09:01:00"}
+
+
+def test_journal_replays_after_restart(db, make_session, tmp_path):
+    make_session("s1")
+    journal = str(tmp_path / "journal.db")
+
+    async def failing_insert(records):
+        raise ConnectionError("database unavailable")
+
+    async def run():
+        writer = RecordWriter(journal, failing_insert, flush_interval=60)
+        await writer.start()
+        await writer.append([record("s1", "a@school.edu"), record("s1", "b@school.edu")])
+        assert not await writer.flush()
+        # Stopping flushes what it can; the upstream is still down, so both records stay journaled
+        await writer.stop()
+
+        flushed = []
+        restarted = RecordWriter(journal, db.insert_records, flush_interval=60, on_flushed=flushed.extend)
+        await restarted.start()
+        assert restarted.queue_depth == 2
+        await restarted.drain()
+        await restarted.stop()
+        return flushed, await db.get_session_records("s1")
+
+    flushed, records = asyncio.run(run())
+    assert sorted(r["student_email"] for r in flushed) == ["a@school.edu", "b@school.edu"]
+    assert sorted(r["student_email"] for r in records) == ["a@school.edu", "b@school.edu"]
+
+
+def test_on_flushed_gets_only_inserted_rows(db, make_session, tmp_path):
+    make_session("s1")
+
+    async def run():
+        await db.record_checkin("s1", "a@school.edu", "A", "2024-01-01T09:00:00", "present", None)
+        flushed = []
+        writer = RecordWriter(str(tmp_path / "journal.db"), db.insert_records, flush_interval=60,
+                              on_flushed=flushed.append)
+        await writer.start()
+        await writer.append([record("s1", "a@school.edu")])
+        await writer.drain()
+        await writer.append([record("s1", "a@school.edu"), record("s1", "b@school.edu")])
+        await writer.drain()
+        await writer.stop()
+        return flushed, writer.stats()
+
+    flushed, stats = asyncio.run(run())
+    assert [[r["student_email"] for r in batch] for batch in flushed] == [["b@school.edu"]]
+    assert stats["queue_depth"] == 0 and stats["flushed"] == 3
+
+
+def test_rejected_records_are_dead_lettered_and_the_rest_flow(db, make_session, tmp_path):
+    make_session("s1")
+    journal = str(tmp_path / "journal.db")
+
+    async def run():
+        flushed = []
+        writer = RecordWriter(journal, db.insert_records, flush_interval=60, on_flushed=flushed.extend)
+        await writer.start()
+        # No such session: the foreign key rejects this record, whichever batch it is in
+        await writer.append([
+            record("s1", "a@school.edu"),
+            record("missing", "b@school.edu"),
+            record("s1", "c@school.edu"),
+            record("s1", "d@school.edu"),
+        ])
+        await writer.drain()
+        stats = writer.stats()
+        await writer.stop()
+
+        reopened = RecordWriter(journal, db.insert_records, flush_interval=60)
+        await reopened.start()
+        dead = reopened._conn.execute("SELECT record, error FROM record_dead_letter").fetchall()
+        reopened_stats = reopened.stats()
+        await reopened.stop()
+        return flushed, stats, dead, reopened_stats
+
+    flushed, stats, dead, reopened_stats = asyncio.run(run())
+    assert sorted(r["student_email"] for r in flushed) == ["a@school.edu", "c@school.edu", "d@school.edu"]
+    assert stats["queue_depth"] == 0 and stats["dead_lettered"] == 1
+    assert len(dead) == 1 and '"missing"' in dead[0][0] and "FOREIGN KEY" in dead[0][1]
+    assert reopened_stats["dead_lettered"] == 1
+
+
+def test_outages_keep_the_batch_journaled(tmp_path):
+    async def unavailable(records):
+        raise ConnectionError("database unavailable")
+
+    async def run():
+        writer = RecordWriter(str(tmp_path / "journal.db"), unavailable, flush_interval=60)
+        await writer.start()
+        await writer.append([record("s1", "a@school.edu")])
+        flushed = await writer.flush()
+        stats = writer.stats()
+        await writer.stop()
+        return flushed, stats
+
+    flushed, stats = asyncio.run(run())
+    assert not flushed
+    assert stats["queue_depth"] == 1 and stats["dead_lettered"] == 0
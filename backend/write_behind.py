@@ -0,0 +1,243 @@
+# write_behind.py
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RecordWriter:
+    """Write-behind queue for attendance records, backed by a local SQLite journal.
+
+    append() returns once the record is durably committed to the journal; a
+    background task flushes journaled records upstream in batches. While the
+    upstream keeps failing, flushes back off exponentially up to
+    max_retry_interval, so a backlog does not hammer a struggling database.
+
+    insert_batch returns the rows it actually inserted; only those reach
+    on_flushed, so a replayed or duplicate record is not reported twice.
+
+    A batch the upstream rejects outright (an error with a true `rejected`
+    attribute, e.g. a constraint violation) is split until the offending
+    records are found; those move to a dead-letter table in the journal so
+    the records behind them keep flowing.
+    """
+
+    def __init__(
+        self,
+        journal_path: str,
+        insert_batch: Callable[[List[Dict]], Awaitable[List[Dict]]],
+        batch_size: int = 50,
+        flush_interval: float = 0.05,
+        retry_interval: float = 1.0,
+        max_retry_interval: float = 30.0,
+        on_flushed: Optional[Callable[[List[Dict]], None]] = None,
+    ):
+        self.journal_path = journal_path
+        self.insert_batch = insert_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.on_flushed = on_flushed
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.queue_depth = 0
+        self.oldest_pending: Optional[float] = None
+        self.appended = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.dead_lettered = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.last_error: Optional[str] = None
+
+    def _open(self):
+        conn = sqlite3.connect(self.journal_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS record_journal (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                record TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS record_dead_letter (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                record TEXT NOT NULL,
+                error TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        conn.commit()
+        self._conn = conn
+        self.queue_depth, self.oldest_pending = conn.execute(
+            "SELECT COUNT(*), MIN(created_at) FROM record_journal"
+        ).fetchone()
+        self.dead_lettered = conn.execute("SELECT COUNT(*) FROM record_dead_letter").fetchone()[0]
+
+    def _append(self, records: List[Dict]):
+        with self._lock:
+            now = time.time()
+            self._conn.executemany(
+                "INSERT INTO record_journal (record, created_at) VALUES (?, ?)",
+                [(json.dumps(record), now) for record in records],
+            )
+            self._conn.commit()
+            self.queue_depth += len(records)
+            if self.oldest_pending is None:
+                self.oldest_pending = now
+
+    def _read_batch(self) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, record FROM record_journal ORDER BY id LIMIT ?",
+                (self.batch_size,),
+            ).fetchall()
+
+    def _delete(self, ids: List[int], dead_letters: List[Tuple[str, str]] = ()):
+        """Remove flushed rows, moving (record, error) pairs to the dead-letter table in the same commit"""
+        with self._lock:
+            now = time.time()
+            self._conn.executemany(
+                "INSERT INTO record_dead_letter (record, error, created_at) VALUES (?, ?, ?)",
+                [(record, error, now) for record, error in dead_letters],
+            )
+            self._conn.executemany("DELETE FROM record_journal WHERE id = ?", [(row_id,) for row_id in ids])
+            self._conn.commit()
+            self.queue_depth -= len(ids)
+            self.dead_lettered += len(dead_letters)
+            self.oldest_pending = self._conn.execute("SELECT MIN(created_at) FROM record_journal").fetchone()[0]
+
+    async def start(self):
+        """Open the journal and start flushing (including records left from a previous run)"""
+        await asyncio.to_thread(self._open)
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+        if self.queue_depth:
+            logger.info(f"Write-behind journal has {self.queue_depth} records to replay")
+
+    async def stop(self):
+        """Stop the background task and flush whatever is left"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._conn is not None:
+            while self.queue_depth and await self.flush():
+                pass
+            self._conn.close()
+            self._conn = None
+
+    async def append(self, records: List[Dict]):
+        """Durably journal records; they are sent upstream by the next flush"""
+        await asyncio.to_thread(self._append, records)
+        self.appended += len(records)
+        if self.queue_depth >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """Send one batch upstream. Returns False if the upstream insert failed."""
+        # The background task and drain() may both flush; one batch at a time
+        async with self._flush_lock:
+            return await self._flush_batch()
+
+    async def _flush_batch(self) -> bool:
+        rows = await asyncio.to_thread(self._read_batch)
+        if not rows:
+            return True
+
+        started = time.perf_counter()
+        try:
+            inserted, dead_letters = await self._insert_isolating(rows)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.error(f"Write-behind flush failed ({len(rows)} records kept): {e}")
+            return False
+
+        if dead_letters:
+            logger.error(f"Write-behind moved {len(dead_letters)} rejected records to the dead-letter table")
+        await asyncio.to_thread(self._delete, [row_id for row_id, _ in rows], dead_letters)
+        if self.on_flushed is not None and inserted:
+            self.on_flushed(inserted)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.batches += 1
+        self.flushed += len(rows)
+        self.last_flush_ms = elapsed_ms
+        self.total_flush_ms += elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self.last_error = None
+        return True
+
+    async def _insert_isolating(self, rows: List[tuple]) -> Tuple[List[Dict], List[Tuple[str, str]]]:
+        """Insert journal rows, bisecting a rejected batch down to the records at fault.
+        Returns (inserted rows, [(record, error)] rejected); other errors propagate."""
+        try:
+            return await self.insert_batch([json.loads(record) for _, record in rows]), []
+        except Exception as e:
+            if not getattr(e, "rejected", False):
+                raise
+            if len(rows) == 1:
+                return [], [(rows[0][1], str(e))]
+        # Halves already inserted before a later failure are skipped as duplicates on the retry
+        middle = len(rows) // 2
+        inserted_head, rejected_head = await self._insert_isolating(rows[:middle])
+        inserted_tail, rejected_tail = await self._insert_isolating(rows[middle:])
+        return inserted_head + inserted_tail, rejected_head + rejected_tail
+
+    async def drain(self):
+        """Flush until the journal is empty; raises if the upstream insert fails"""
+        while self.queue_depth:
+            if not await self.flush():
+                raise RuntimeError(f"Write-behind flush failed: {self.last_error}")
+
+    async def _run(self):
+        retry_interval = self.retry_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            while self.queue_depth:
+                if not await self.flush():
+                    await asyncio.sleep(retry_interval)
+                    retry_interval = min(retry_interval * 2, self.max_retry_interval)
+                    break
+                retry_interval = self.retry_interval
+
+    def stats(self) -> Dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "oldest_pending_seconds": round(time.time() - self.oldest_pending, 1) if self.oldest_pending else 0.0,
+            "appended": self.appended,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failures": self.failures,
+            "dead_lettered": self.dead_lettered,
+            "last_flush_ms": round(self.last_flush_ms, 1),
+            "avg_flush_ms": round(self.total_flush_ms / self.batches, 1) if self.batches else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 1),
+            "last_error": self.last_error,
+        }
@@ -3,7 +3,8 @@
 
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response
+from fastapi.concurrency import run_in_threadpool
 import cv2
 import face_recognition
 import numpy as np
@@ -14,6 +15,9 @@ import sqlite3
 import json
 from typing import Optional, Dict, Any
 import requests
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 import logging
 from dotenv import load_dotenv
@@ -27,6 +31,8 @@ HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", 8000))
 DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 FACE_THRESHOLD = float(os.getenv("FACE_VERIFICATION_THRESHOLD", 0.6))
+PREVIEW_CACHE_SECONDS = float(os.getenv("PREVIEW_CACHE_SECONDS", 1.0))
+PREVIEW_CACHE_SIZE = int(os.getenv("PREVIEW_CACHE_SIZE", 64))
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -183,6 +189,64 @@ def calculate_face_similarity(encoding1: np.ndarray, encoding2: np.ndarray) -> f
         logger.error(f"Error calculating similarity: {str(e)}")
         return 0.0
 
+def make_thumbnail(image_bytes: bytes, width: int, quality: int) -> bytes:
+    """Downscale a JPEG to the target width and re-encode it"""
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Failed to decode image")
+    
+    height, current_width = image.shape[:2]
+    if current_width > width:
+        image = cv2.resize(image, (width, max(1, int(height * width / current_width))), interpolation=cv2.INTER_AREA)
+    
+    ok, encoded = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    if not ok:
+        raise ValueError("Failed to encode preview")
+    return encoded.tobytes()
+
+# Most recent preview per (camera, width, quality), shared between viewers.
+# Bounded LRU, since the camera, width and quality all come from the client.
+preview_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+preview_cache_lock = threading.Lock()
+# A fixed set of locks, picked by key hash, so there is no per-key lock to clean up
+preview_locks = [threading.Lock() for _ in range(16)]
+
+def get_cached_preview(key: str) -> Optional[bytes]:
+    with preview_cache_lock:
+        cached = preview_cache.get(key)
+        if cached and time.time() - cached["captured_at"] < PREVIEW_CACHE_SECONDS:
+            preview_cache.move_to_end(key)
+            return cached["image"]
+        return None
+
+def cache_preview(key: str, preview: bytes):
+    with preview_cache_lock:
+        preview_cache[key] = {"image": preview, "captured_at": time.time()}
+        preview_cache.move_to_end(key)
+        while len(preview_cache) > PREVIEW_CACHE_SIZE:
+            preview_cache.popitem(last=False)
+
+def get_webcam_preview(webcam_url: str, auth, width: int, quality: int) -> bytes:
+    """Get a downscaled preview, reusing a recent one for the same camera.
+    
+    Blocking (requests and cv2): call it from a worker thread.
+    """
+    key = f"{webcam_url}:{width}:{quality}"
+    
+    # One fetch per camera at a time; waiting viewers pick up the fresh preview
+    with preview_locks[hash(key) % len(preview_locks)]:
+        cached = get_cached_preview(key)
+        if cached is not None:
+            return cached
+        
+        response = requests.get(webcam_url, auth=auth, timeout=10)
+        if response.status_code != 200:
+            raise HTTPException(status_code=400, detail="Failed to capture image from webcam")
+        
+        preview = make_thumbnail(response.content, width, quality)
+        cache_preview(key, preview)
+        return preview
+
 # API Endpoints
 
 @app.post("/api/face/register")
@@ -274,6 +338,19 @@ async def verify_face(
         logger.error(f"Error in verify_face: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Verification failed: {str(e)}")
 
+def int_param(request: Dict[str, Any], name: str, default: Optional[int], minimum: int, maximum: int) -> Optional[int]:
+    """An integer body field within [minimum, maximum], or 400"""
+    value = request.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"{name} must be an integer")
+    if not minimum <= value <= maximum:
+        raise HTTPException(status_code=400, detail=f"{name} must be between {minimum} and {maximum}")
+    return value
+
 @app.post("/api/webcam/capture")
 async def capture_from_webcam(request: Dict[str, Any]):
     """Capture image from IP webcam"""
@@ -294,17 +371,38 @@ async def capture_from_webcam(request: Dict[str, Any]):
         if username and password:
             auth = (username, password)
         
-        # Capture image from webcam
-        response = requests.get(webcam_url, auth=auth, timeout=10)
+        # Downscaled preview, shared between viewers of the same camera
+        width = int_param(request, 'width', None, 16, 4096)
+        if width:
+            quality = int_param(request, 'quality', 70, 10, 95)
+            preview = await run_in_threadpool(get_webcam_preview, webcam_url, auth, width, quality)
+            return Response(content=preview, media_type="image/jpeg")
+        
+        # Full resolution: stream the webcam response straight through
+        response = await run_in_threadpool(requests.get, webcam_url, auth=auth, timeout=10, stream=True)
         
         if response.status_code != 200:
+            response.close()
             raise HTTPException(status_code=400, detail="Failed to capture image from webcam")
         
+        headers = {}
+        if response.headers.get("Content-Length"):
+            headers["Content-Length"] = response.headers["Content-Length"]
+        
+        def body():
+            try:
+                yield from response.iter_content(chunk_size=64 * 1024)
+            finally:
+                response.close()
+        
         return StreamingResponse(
-            io.BytesIO(response.content),
-            media_type="image/jpeg"
+            body(),
+            media_type="image/jpeg",
+            headers=headers
         )
         
+    except HTTPException:
+        raise
     except requests.RequestException as e:
         logger.error(f"Webcam capture error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Webcam connection failed: {str(e)}")